@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the streaming DIMACS writer and reader, plain and gzipped.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_dimacs.py [clauses]
+
+The instance is `clauses` random 3-SAT clauses (default 1000000) over
+clauses / 4 variables.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from ssaa.dimacs import open_dimacs, write_dimacs, DimacsReader
+from ssaa.random_formula import random_clauses
+
+
+def main(n=1000000):
+    random.seed(0)
+    variables = n // 4
+    clauses = random_clauses(variables, n)
+    directory = tempfile.mkdtemp()
+    try:
+        for name in ("instance.cnf", "instance.cnf.gz"):
+            path = os.path.join(directory, name)
+            start = time.time()
+            fout = open_dimacs(path, "w")
+            write_dimacs(fout, clauses, variables)
+            fout.close()
+            written = time.time() - start
+            size = os.path.getsize(path) / 2.0 ** 20
+            start = time.time()
+            fin = open_dimacs(path)
+            count = sum(1 for _ in DimacsReader(fin))
+            fin.close()
+            read = time.time() - start
+            assert count == n
+            print "{:<16} {:>8.1f} MB  write {:>6.2f}s  read {:>6.2f}s  " \
+                  "({:.0f} clauses/s)".format(name, size, written, read,
+                                              n / read)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
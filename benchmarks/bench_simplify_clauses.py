@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+simplify_clauses (watched literals) against the previous implementation,
+which rebuilt every clause on every propagation round.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_simplify_clauses.py [bits]
+
+The instances are the Tseitin clauses of a `bits` bit multiplier (default
+24) with both factors assigned, so propagation goes through the whole
+circuit, and the same clauses with only the product assigned.
+"""
+import sys
+import time
+
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import TSEITIN
+from ssaa.solver import simplify_clauses, reduce_clauses_with_assignment, \
+                        iter_unit_literals, iter_pure_literals, iter_vars, \
+                        assignment_to_clauses
+
+
+def previous_simplify_clauses(clauses):
+    original_vars = set(iter_vars(clauses))
+    global_assignments = set()
+    clauses = reduce_clauses_with_assignment(clauses, global_assignments)
+    step_assignments = set(iter_unit_literals(clauses)) | \
+                       set(iter_pure_literals(clauses))
+    while step_assignments:
+        for lit in step_assignments:
+            if -lit not in global_assignments:
+                global_assignments.add(lit)
+        clauses = reduce_clauses_with_assignment(clauses, global_assignments)
+        if clauses is None:
+            clauses = [[]]
+            break
+        step_assignments = set(iter_unit_literals(clauses)) | \
+                           set(iter_pure_literals(clauses))
+    assigned = set(abs(lit) for lit in global_assignments)
+    unassigned = set(iter_vars(clauses))
+    free = (original_vars - assigned) - unassigned
+    return clauses, global_assignments, free
+
+
+def instances(bits):
+    a = Integer(bits)
+    b = Integer(bits)
+    c = a * b
+    formula = c.get_propositional_formula()
+    clauses, names, _ = formula.to_clauses(TSEITIN)
+    factors = {}
+    factors.update(a.build_assignment(2 ** bits - 3))
+    factors.update(b.build_assignment(2 ** (bits - 1) + 5))
+    product = c.build_assignment(2 ** bits - 5)
+    return [("factors assigned", clauses +
+                                 assignment_to_clauses(factors, names)),
+            ("product assigned", clauses +
+                                 assignment_to_clauses(product, names))]
+
+
+def bench(function, clauses):
+    start = time.time()
+    result = function([list(x) for x in clauses])
+    return time.time() - start, result
+
+
+def main(bits=24):
+    for name, clauses in instances(bits):
+        new, (simple, assign, _) = bench(simplify_clauses, clauses)
+        old, (old_simple, old_assign, _) = bench(previous_simplify_clauses,
+                                                 clauses)
+        assert len(simple) == len(old_simple)
+        print "{:<18} {:>8} clauses {:>8} assigned  previous {:>8.2f}s  " \
+              "watched {:>6.2f}s".format(name, len(clauses), len(assign),
+                                         old, new)
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the formula transformations, in subformulas per second,
+against the previous recursive implementations.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_transformations.py [depth]
+
+`depth` is the depth of the implication chain (default 100, which the
+previous transformations can still handle; from about 300 on they hit the
+recursion limit and are reported as such).
+"""
+import sys
+import time
+import itertools
+
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import Symbol, Not, And, Or, Implies, Iff, \
+                                     Xor, is_atomic, remove_sugar, \
+                                     apply_demorgan, to_negative_normal_form, \
+                                     cnf_distribute_and, pformula, rformula, \
+                                     post_order_depth_first
+
+
+def _memoized(transformation):
+    def wrapper(formula, memo=None):
+        if memo is None:
+            memo = {}
+        if formula not in memo:
+            memo[formula] = transformation(formula, memo)
+        return memo[formula]
+    return wrapper
+
+
+def previous_pformula(formula, var=None):
+    if var is None:
+        var = {}
+    if formula in var:
+        return var[formula]
+    if isinstance(formula, Symbol):
+        ret = u"p{}".format(len(var))
+        var[formula] = ret
+        return ret
+    if isinstance(formula, Not):
+        return u"¬{}".format(previous_pformula(formula.args[0], var))
+    if isinstance(formula, And):
+        sep = u" and "
+    if isinstance(formula, Or):
+        sep = u" or "
+    if isinstance(formula, Implies):
+        sep = u" => "
+    if isinstance(formula, Iff):
+        sep = u" <=> "
+    if isinstance(formula, Xor):
+        sep = u" ° "
+    return "(" + sep.join(previous_pformula(x, var)
+                          for x in formula.args) + ")"
+
+
+def previous_rformula(formula, var=None):
+    if var is None:
+        var = {}
+    if formula in var:
+        return var[formula]
+    if isinstance(formula, Symbol):
+        ret = u"p{}".format(len(var))
+        var[formula] = ret
+        return ret
+    if isinstance(formula, Not):
+        return u"¬{}".format(previous_rformula(formula.args[0], var))
+    return formula.__class__.__name__ + \
+           "(" + ", ".join(previous_rformula(x, var)
+                           for x in formula.args) + ")"
+
+
+@_memoized
+def previous_remove_sugar(formula, memo):
+    if isinstance(formula, Symbol):
+        return formula
+    if isinstance(formula, Not):
+        return -previous_remove_sugar(formula.args[0], memo)
+    if len(formula.args) == 1:
+        return previous_remove_sugar(formula.args[0], memo)
+    if isinstance(formula, And):
+        return And(*[previous_remove_sugar(x, memo) for x in formula.args])
+    if isinstance(formula, Or):
+        return Or(*[previous_remove_sugar(x, memo) for x in formula.args])
+    if isinstance(formula, Implies):
+        P, Q = formula.args
+        return previous_remove_sugar(-P | Q, memo)
+    if isinstance(formula, Iff):
+        P, Q = formula.args
+        return previous_remove_sugar((-P | Q) & (-Q | P), memo)
+    if isinstance(formula, Xor):
+        P, Q = formula.args
+        return previous_remove_sugar((-P & Q) | (-Q & P), memo)
+    assert False
+
+
+@_memoized
+def previous_apply_demorgan(formula, memo):
+    if is_atomic(formula):
+        return formula
+    if isinstance(formula, Not):
+        sub = formula.args[0]
+        if isinstance(sub, Not):
+            return previous_apply_demorgan(sub.args[0], memo)
+        if isinstance(sub, And):
+            return previous_apply_demorgan(Or(*[-x for x in sub.args]), memo)
+        if isinstance(sub, Or):
+            return previous_apply_demorgan(And(*[-x for x in sub.args]),
+                                           memo)
+        assert False
+    if isinstance(formula, And):
+        return And(*[previous_apply_demorgan(x, memo) for x in formula.args])
+    if isinstance(formula, Or):
+        return Or(*[previous_apply_demorgan(x, memo) for x in formula.args])
+    assert False
+
+
+@_memoized
+def previous_cnf_distribute_or(formula, memo):
+    ands = []
+    rest = []
+    for x in formula.args:
+        if isinstance(x, And):
+            ands.append(previous_cnf_distribute_and(x, memo))
+        else:
+            rest.append(x)
+    if not ands:
+        return formula
+    ys = []
+    factors = [x.args for x in ands]
+    if rest:
+        factors.append((Or(*rest),))
+    for xs in itertools.product(*factors):
+        ys.append(Or(*xs))
+    return And(*ys)
+
+
+@_memoized
+def previous_cnf_distribute_and(formula, memo):
+    xs = []
+    for x in formula.args:
+        if isinstance(x, Or):
+            xs.append(previous_cnf_distribute_or(x, memo))
+        else:
+            xs.append(x)
+    return And(*xs)
+
+
+def chain(depth):
+    formula = Symbol()
+    for _ in xrange(depth):
+        formula = Implies(Symbol(), -formula)
+    return formula
+
+
+def multiplier(bits):
+    a = Integer(bits)
+    b = Integer(bits)
+    return (a * b).get_propositional_formula()
+
+
+def throughput(formula, function, repeat=5):
+    nodes = len(post_order_depth_first(formula))
+    best = None
+    for _ in xrange(repeat):
+        start = time.time()
+        try:
+            function(formula)
+        except RuntimeError:  # Maximum recursion depth exceeded
+            return None
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return nodes / best
+
+
+def bench(name, formula, function, previous):
+    new = throughput(formula, function)
+    old = throughput(formula, previous)
+    if old is None:
+        print "{:<34} previous: recursion limit  iterative {:>10.0f} " \
+              "nodes/s".format(name, new)
+    else:
+        print "{:<34} previous {:>10.0f}  iterative {:>10.0f} nodes/s  " \
+              "ratio {:.2f}".format(name, old, new, new / old)
+
+
+def main(depth=100):
+    deep = chain(depth)
+    wide = multiplier(16)
+    for name, formula in [("chain({})".format(depth), deep),
+                          ("16 bit multiplier", wide)]:
+        bench(name + " remove_sugar", formula, remove_sugar,
+              previous_remove_sugar)
+        bench(name + " apply_demorgan", remove_sugar(formula),
+              apply_demorgan, previous_apply_demorgan)
+        bench(name + " pformula", formula, pformula, previous_pformula)
+        bench(name + " rformula", formula, rformula, previous_rformula)
+        if formula is wide:
+            bench(name + " cnf_distribute_and",
+                  to_negative_normal_form(formula), cnf_distribute_and,
+                  previous_cnf_distribute_and)
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
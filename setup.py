@@ -25,4 +25,6 @@ setup(
         ],
     packages=["ssaa"],
     install_requires=open('requirements.txt').read().split(),
+    # Without pycosat, pycosat_solve falls back to the built-in CDCL solver
+    extras_require={"pycosat": ["pycosat"]},
 )
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+And-Inverter Graphs: circuits made only of two-input AND nodes and
+complemented edges. Structurally identical nodes are shared (structural
+hashing) and every new node goes through local two-level rewriting rules,
+so circuits come out smaller than the formulas they are lowered from.
+The AND_INVERTER encoding generates its clauses from them.
+
+Literals are integers: node n is the literal 2 * n and its complement is
+2 * n + 1. Node 0 is the constant FALSE, so FALSE_LITERAL is 0 and
+TRUE_LITERAL is 1.
+"""
+from ssaa.propositional_logic import Symbol, Constant, And, Or, Not, \
+                                     Implies, Iff, FALSE, iter_symbols
+
+FALSE_LITERAL = 0
+TRUE_LITERAL = 1
+
+
+class AndInverterGraph(object):
+    """
+    Nodes are numbered in creation order, so the fanins of a node always
+    have smaller numbers than the node itself.
+    """
+    def __init__(self):
+        self.fanins = [None]  # Node -> (literal, literal), None for inputs
+        self.inputs = {}  # Input node -> Symbol
+        self.assertions = []  # Literals that have to be true
+        self._strash = {}
+        self._definitions = {}
+        self._pending = set()
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.fanins)
+
+    def input(self, symbol):
+        lit = self._memo.get(symbol)
+        if lit is None:
+            self.fanins.append(None)
+            lit = 2 * (len(self.fanins) - 1)
+            self.inputs[lit >> 1] = symbol
+            self._memo[symbol] = lit
+        return lit
+
+    def and_(self, a, b):
+        if a > b:
+            a, b = b, a
+        if a == FALSE_LITERAL or a == b ^ 1:
+            return FALSE_LITERAL
+        if a == TRUE_LITERAL:
+            return b
+        if a == b:
+            return a
+        fa = self.fanins[a >> 1]
+        fb = self.fanins[b >> 1]
+        for x, y, fx in ((a, b, fa), (b, a, fb)):
+            if fx is None:
+                continue
+            if not x & 1:
+                if y ^ 1 in fx:  # (p & q) & -p
+                    return FALSE_LITERAL
+                if y in fx:  # (p & q) & p
+                    return x
+            else:
+                if y ^ 1 in fx:  # -(p & q) & -p
+                    return y
+                if y == fx[0]:  # -(p & q) & p
+                    return self.and_(y, fx[1] ^ 1)
+                if y == fx[1]:
+                    return self.and_(y, fx[0] ^ 1)
+        if fa is not None and fb is not None:
+            lit = self._two_level(a, b, fa, fb)
+            if lit is not None:
+                return lit
+        key = a, b
+        lit = self._strash.get(key)
+        if lit is None:
+            self.fanins.append(key)
+            lit = 2 * (len(self.fanins) - 1)
+            self._strash[key] = lit
+        return lit
+
+    def _two_level(self, a, b, fa, fb):
+        """
+        Rules for the AND of two AND nodes (or their complements), None if
+        none applies.
+        """
+        if not a & 1 and not b & 1:
+            for x in fa:  # (p & q) & (-p & r)
+                if x ^ 1 in fb:
+                    return FALSE_LITERAL
+        elif a & 1 and b & 1:
+            if fa[0] in fb or fa[1] in fb:  # -(p & q) & -(p & -q) is -p
+                p = fa[0] if fa[0] in fb else fa[1]
+                q = fa[1] if p == fa[0] else fa[0]
+                if q ^ 1 in fb:
+                    return p ^ 1
+        else:
+            if a & 1:
+                a, b, fa, fb = b, a, fb, fa
+            for x in fb:
+                if x ^ 1 in fa:  # (p & q) & -(-p & r) is (p & q)
+                    return a
+            for x, y in (fb, fb[::-1]):
+                if x in fa:  # (p & q) & -(p & r) is (p & q) & -r
+                    return self.and_(a, y ^ 1)
+        return None
+
+    def or_(self, a, b):
+        return self.and_(a ^ 1, b ^ 1) ^ 1
+
+    def xor(self, a, b):
+        # Written as (a | b) & -(a & b) so it shares a & b with a half adder
+        return self.and_(self.and_(a ^ 1, b ^ 1) ^ 1, self.and_(a, b) ^ 1)
+
+    def iff(self, a, b):
+        return self.xor(a, b) ^ 1
+
+    def implies(self, a, b):
+        return self.and_(a, b ^ 1) ^ 1
+
+    def define(self, symbol, formula):
+        """
+        Make symbol stand for formula in the next calls to add_formula
+        instead of being an input. If the definition turns out to depend on
+        the symbol itself the symbol stays an input and `symbol <=> formula`
+        is added to the assertions.
+        """
+        if symbol in self._definitions or symbol in self._memo:
+            raise ValueError("{!r} is already defined".format(symbol))
+        self._definitions[symbol] = formula
+
+    def is_defined(self, symbol):
+        return symbol in self._definitions
+
+    def add_formula(self, formula):
+        """
+        Lower the formula into the graph and return its literal.
+        """
+        memo = self._memo
+        stack = [formula]
+        while stack:
+            node = stack[-1]
+            if node in self._pending:
+                stack.pop()
+                definition = self._definitions[node]
+                if definition not in memo:  # A cycle, cut it here
+                    self.input(node)
+                    continue
+                self._pending.remove(node)
+                lit = memo[definition]
+                if node in memo:
+                    self.assertions.append(self.iff(memo[node], lit))
+                else:
+                    memo[node] = lit
+                continue
+            if node in memo:
+                stack.pop()
+                continue
+            if isinstance(node, Symbol):
+                if node in self._definitions:
+                    self._pending.add(node)
+                    stack.append(self._definitions[node])
+                else:
+                    stack.pop()
+                    self.input(node)
+                continue
+            if isinstance(node, Constant):
+                memo[node] = TRUE_LITERAL if node.value else FALSE_LITERAL
+                stack.pop()
+                continue
+            missing = [x for x in node.args if x not in memo]
+            if missing:
+                missing.reverse()
+                stack.extend(missing)
+                continue
+            stack.pop()
+            memo[node] = self._lower(node, [memo[x] for x in node.args])
+        return memo[formula]
+
+    def _lower(self, node, args):
+        if isinstance(node, Not):
+            return args[0] ^ 1
+        if isinstance(node, And):
+            return reduce(self.and_, args)
+        if isinstance(node, Or):
+            return reduce(self.or_, args)
+        if isinstance(node, Implies):
+            return self.implies(*args)
+        if isinstance(node, Iff):
+            return self.iff(*args)
+        return self.xor(*args)
+
+    def literal(self, symbol):
+        return self.add_formula(symbol)
+
+    def cone(self, lits):
+        """
+        Sorted list of the nodes the literals depend on (including constant
+        and input nodes), which is a topological order.
+        """
+        seen = set()
+        stack = [lit >> 1 for lit in lits]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            fanins = self.fanins[node]
+            if fanins is not None:
+                stack.extend(x >> 1 for x in fanins)
+        return sorted(seen)
+
+    def to_formula(self, lit):
+        formulas = {0: FALSE}
+        for node in self.cone([lit]):
+            fanins = self.fanins[node]
+            if fanins is not None:
+                a, b = [formulas[x >> 1] if not x & 1 else -formulas[x >> 1]
+                        for x in fanins]
+                formulas[node] = And(a, b)
+            elif node:
+                formulas[node] = self.inputs[node]
+        formula = formulas[lit >> 1]
+        return -formula if lit & 1 else formula
+
+    def evaluate(self, lit, assignment):
+        values = {0: False}
+        for node in self.cone([lit]):
+            fanins = self.fanins[node]
+            if fanins is not None:
+                a, b = [values[x >> 1] is not bool(x & 1) for x in fanins]
+                values[node] = a and b
+            elif node:
+                values[node] = self.inputs[node].evaluate(assignment)
+        return values[lit >> 1] is not bool(lit & 1)
+
+
+def from_constraints(formula):
+    """
+    Lower a formula into a new graph, taking every conjunct of the form
+    `Iff(symbol, f)` as the definition of the symbol (the way the gates of
+    sat_arithmetic are written) and asserting the rest.
+    """
+    graph = AndInverterGraph()
+    conjuncts = formula.args if isinstance(formula, And) else (formula,)
+    constraints = []
+    for conjunct in conjuncts:
+        if isinstance(conjunct, Iff):
+            a, b = conjunct.args
+            if isinstance(b, Symbol) and not graph.is_defined(b):
+                a, b = b, a
+            if isinstance(a, Symbol) and not graph.is_defined(a):
+                graph.define(a, b)
+                continue
+        constraints.append(conjunct)
+    for constraint in constraints:
+        graph.assertions.append(graph.add_formula(constraint))
+    for symbol in iter_symbols(formula):
+        graph.literal(symbol)
+    return graph
+
+
+def _split(graph, lits):
+    """
+    Asserting a & b is asserting a and b.
+    """
+    result = []
+    stack = list(reversed(lits))
+    while stack:
+        lit = stack.pop()
+        fanins = graph.fanins[lit >> 1]
+        if fanins is not None and not lit & 1:
+            stack.extend(reversed(fanins))
+        else:
+            result.append(lit)
+    return result
+
+
+def iter_aig_clauses(formula, names, reverse):
+    """
+    Clauses for the AND_INVERTER encoding, as iter_int_clauses.
+    Every AND node gets a variable and three clauses. A symbol shares the
+    variable of the node it is defined as when it can, otherwise it gets
+    its own variable tied to the node with two clauses.
+    """
+    graph = from_constraints(formula)
+    symbols = list(iter_symbols(formula))
+    roots = _split(graph, graph.assertions)
+    variables = {}
+
+    def name(atom, node=None):
+        var = names.get(atom)  # Could be named by earlier clauses
+        if var is None:
+            var = len(reverse)
+            names[atom] = var
+            reverse.append(atom)
+        if node is not None:
+            variables[node] = var
+        return var
+
+    def int_lit(lit):
+        var = variables[lit >> 1]
+        return -var if lit & 1 else var
+
+    done = set()
+    for symbol in symbols:
+        lit = graph.literal(symbol)
+        if not lit & 1 and graph.inputs.get(lit >> 1) is symbol:
+            name(symbol, lit >> 1)
+            done.add(symbol)
+    for symbol in symbols:
+        lit = graph.literal(symbol)
+        if symbol not in done and lit > 1 and not lit & 1 and \
+                lit >> 1 not in variables:
+            name(symbol, lit >> 1)
+            done.add(symbol)
+    used = set()
+    for node in graph.cone(roots + [graph.literal(x) for x in symbols]):
+        fanins = graph.fanins[node]
+        if fanins is None:
+            continue
+        if node not in variables:
+            name(Symbol(), node)
+        var = variables[node]
+        a, b = [int_lit(x) for x in fanins]
+        used.update(x >> 1 for x in fanins)
+        yield [-var, a]
+        yield [-var, b]
+        yield [var, -a, -b]
+    for symbol in symbols:
+        if symbol in done:
+            continue
+        var = name(symbol)
+        lit = graph.literal(symbol)
+        if lit <= 1:
+            yield [var] if lit else [-var]
+        else:
+            used.add(lit >> 1)
+            lit = int_lit(lit)
+            yield [-var, lit]
+            yield [var, -lit]
+    for node in graph.inputs:
+        if node in variables and node not in used and \
+                not any(x >> 1 == node for x in roots):
+            var = variables[node]
+            yield [var, -var]  # Keep it in the model
+    for lit in roots:
+        if lit == FALSE_LITERAL:
+            yield []
+        elif lit != TRUE_LITERAL:
+            yield [int_lit(lit)]
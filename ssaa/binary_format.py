@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Compact binary files for formulas (as DAGs) and the arithmetic expressions
+whose bits are their inputs and outputs, so a circuit can be built once and
+loaded afterwards instead of rebuilt.
+
+Layout, all integers little-endian:
+
+    header  magic, number of nodes, number of arguments, number of ports,
+            index of the formula's node
+    ops     one byte per node, in post order
+    offsets (nodes + 1) uint32, arguments of node i are args[offsets[i]:
+            offsets[i + 1]]
+    args    uint32 node indexes
+    ports   for each port: name length (uint16), utf-8 name, kind (uint8),
+            number of bits (uint32) and their node indexes (uint32)
+"""
+import array
+import mmap
+import struct
+import sys
+
+from ssaa.propositional_logic import Symbol, Constant, And, Or, Not, \
+                                     Implies, Iff, Xor, TRUE, FALSE, \
+                                     post_order_depth_first
+from ssaa.sat_arithmetic import IntegerExpression, BooleanExpression, \
+                                Integer, Boolean
+
+MAGIC = b"SSAA\x01"
+_HEADER = struct.Struct("<5sIIII")
+_PORT = struct.Struct("<BI")
+
+_OPS = [Symbol, TRUE, FALSE, And, Or, Not, Implies, Iff, Xor]
+_OP_CODES = dict((op, code) for code, op in enumerate(_OPS))
+
+INTEGER = 0
+BOOLEAN = 1
+
+
+def _port_bits(expr):
+    if isinstance(expr, IntegerExpression):
+        return INTEGER, expr.bits
+    if isinstance(expr, BooleanExpression):
+        return BOOLEAN, [expr.bit]
+    raise ValueError("Cannot store {!r} as a port".format(expr))
+
+
+def _uint32s(values):
+    a = array.array("I", values)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tostring()
+
+
+def _read_uint32s(data, position, n):
+    a = array.array("I")
+    a.fromstring(data[position:position + 4 * n])
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a, position + 4 * n
+
+
+def dump(fout, formula, relevant_io=None):
+    """
+    Write the formula and the bits of the expressions in relevant_io (a dict
+    from names to Integer/Boolean expressions, as Claused takes) to fout.
+    """
+    if relevant_io is None:
+        relevant_io = {}
+    order = post_order_depth_first(formula)
+    index = dict((node, i) for i, node in enumerate(order))
+    root = index[formula]
+    ports = []
+    for name in sorted(relevant_io):
+        kind, bits = _port_bits(relevant_io[name])
+        for bit in bits:
+            if bit not in index:
+                index[bit] = len(order)
+                order.append(bit)
+        ports.append((name, kind, [index[bit] for bit in bits]))
+
+    ops = array.array("B")
+    offsets = [0]
+    args = []
+    for node in order:
+        if isinstance(node, Constant):
+            ops.append(_OP_CODES[node])
+        else:
+            ops.append(_OP_CODES[node.__class__])
+        if not isinstance(node, Symbol):
+            args.extend(index[x] for x in node.args)
+        offsets.append(len(args))
+
+    fout.write(_HEADER.pack(MAGIC, len(order), len(args), len(ports), root))
+    fout.write(ops.tostring())
+    fout.write(_uint32s(offsets))
+    fout.write(_uint32s(args))
+    for name, kind, bits in ports:
+        name = name.encode("utf-8")
+        fout.write(struct.pack("<H", len(name)) + name)
+        fout.write(_PORT.pack(kind, len(bits)))
+        fout.write(_uint32s(bits))
+
+
+def load(fin):
+    """
+    Read a file written by dump, memory-mapping it. Returns the formula and
+    the relevant_io dict with new Integer and Boolean ports.
+    All the Symbols are new.
+    """
+    data = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _load(data)
+    finally:
+        data.close()
+
+
+def _load(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a ssaa formula file")
+    _, n, n_args, n_ports, root = _HEADER.unpack_from(data, 0)
+    position = _HEADER.size
+    ops = array.array("B", data[position:position + n])
+    position += n
+    offsets, position = _read_uint32s(data, position, n + 1)
+    args, position = _read_uint32s(data, position, n_args)
+
+    nodes = []
+    for i, op in enumerate(ops):
+        op = _OPS[op]
+        if op is Symbol:
+            node = Symbol()
+        elif isinstance(op, Constant):
+            node = op
+        else:
+            node = op(*[nodes[j] for j in args[offsets[i]:offsets[i + 1]]])
+        nodes.append(node)
+
+    relevant_io = {}
+    for _ in xrange(n_ports):
+        size, = struct.unpack_from("<H", data, position)
+        position += 2
+        name = data[position:position + size].decode("utf-8")
+        position += size
+        kind, n_bits = _PORT.unpack_from(data, position)
+        position += _PORT.size
+        bits, position = _read_uint32s(data, position, n_bits)
+        bits = [nodes[i] for i in bits]
+        if kind == INTEGER:
+            relevant_io[name] = Integer(bits)
+        else:
+            relevant_io[name] = Boolean(bits[0])
+    return nodes[root], relevant_io
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+A cache of solver results keyed by a canonical form of the clauses, so the
+same problem built again with fresh Symbols (which get other variable
+numbers) is not solved again.
+
+The canonical numbering comes from colour refinement: variables start with
+the same colour and are told apart by the colours of the clauses they are
+in (and with which sign) until no new colours appear. Variables are then
+numbered by colour, ties broken by their first appearance. Variables
+refinement cannot tell apart may be numbered differently for two copies
+of a problem, which only costs a cache miss: the key is a digest of the
+whole renumbered clause set, so a hit is always the same problem.
+"""
+import collections
+import hashlib
+import os
+import tempfile
+
+from cdcl import UNKNOWN
+
+MISSING = object()
+
+
+def _ranks(signatures):
+    """
+    Replace each signature by its position among the distinct ones.
+    """
+    rank = dict((x, i) for i, x in enumerate(sorted(set(signatures))))
+    return [rank[x] for x in signatures]
+
+
+def canonicalize(clauses):
+    """
+    Returns the hex digest of the canonical form of the clauses and the
+    renumbering, a dict from each variable to its canonical number.
+    """
+    variables = []
+    index = {}
+    for clause in clauses:
+        for lit in clause:
+            if abs(lit) not in index:
+                index[abs(lit)] = len(variables)
+                variables.append(abs(lit))
+    clauses = [[(index[abs(lit)], lit > 0) for lit in clause]
+               for clause in clauses]
+    colours = [0] * len(variables)
+    distinct = 1
+    while distinct < len(variables):
+        clause_colours = _ranks([tuple(sorted((colours[var], sign)
+                                              for var, sign in clause))
+                                 for clause in clauses])
+        occurrences = [[] for _ in variables]
+        for clause, colour in zip(clauses, clause_colours):
+            for var, sign in clause:
+                occurrences[var].append((colour, sign))
+        colours = _ranks([(colour, tuple(sorted(occurrence)))
+                          for colour, occurrence in zip(colours,
+                                                        occurrences)])
+        if len(set(colours)) == distinct:
+            break
+        distinct = len(set(colours))
+    order = sorted(xrange(len(variables)), key=lambda i: (colours[i], i))
+    numbers = [0] * len(variables)
+    for number, i in enumerate(order):
+        numbers[i] = number + 1
+    canonical = sorted(sorted(numbers[var] if sign else -numbers[var]
+                              for var, sign in clause)
+                       for clause in clauses)
+    renumbering = dict(zip(variables, numbers))
+    digest = hashlib.sha256()
+    for clause in canonical:
+        digest.update(" ".join(map(str, clause)) + " 0\n")
+    return digest.hexdigest(), renumbering
+
+
+class ResultCache(object):
+    """
+    The last `capacity` results (a model in canonical numbering, or None if
+    unsatisfiable) in memory, and all of them in `directory` if given (one
+    file per problem, so several processes can share it).
+    """
+    def __init__(self, capacity=1024, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        The result stored for key, MISSING if there is none.
+        """
+        result = self.entries.pop(key, MISSING)
+        if result is MISSING and self.directory is not None:
+            result = self._read(key)
+        if result is not MISSING:
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if self.directory is not None:
+            self._write(key, result)
+
+    def _remember(self, key, result):
+        self.entries.pop(key, None)
+        self.entries[key] = result
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as fin:
+                status = fin.readline().strip()
+                if status == "UNSAT":
+                    return None
+                return map(int, fin.read().split())
+        except IOError:
+            return MISSING
+
+    def _write(self, key, result):
+        path = self._path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:  # Another process made it first
+                pass
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as fout:
+            if result is None:
+                fout.write("UNSAT\n")
+            else:
+                fout.write("SAT\n" + " ".join(map(str, result)) + "\n")
+        os.rename(temporary, path)  # Readers never see half a file
+
+    def solve(self, clauses, solver, **limits):
+        """
+        solver(clauses, **limits) unless the result is in the cache. Can be
+        a `solver=` with functools.partial.
+        """
+        key, renumbering = canonicalize(clauses)
+        result = self.get(key)
+        if result is not MISSING:
+            self.hits += 1
+            if result is None:
+                return None
+            inverse = dict((number, var)
+                           for var, number in renumbering.iteritems())
+            return [inverse[lit] if lit > 0 else -inverse[-lit]
+                    for lit in result]
+        self.misses += 1
+        model = solver(clauses, **limits)
+        if model is UNKNOWN:
+            return model
+        if model is None:
+            self.put(key, None)
+        else:
+            self.put(key, sorted(((renumbering[lit] if lit > 0 else
+                                   -renumbering[-lit]) for lit in model
+                                  if abs(lit) in renumbering), key=abs))
+        return model
@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+"""
+A CDCL SAT solver in pure Python. cdcl_solve can be passed as the
+`solver=` of solve and Claused.solve (and is what pycosat_solve falls back
+to without pycosat). CDCLSolver is the incremental interface, with
+assumptions, phases and conflict limits.
+
+Two watched literals per clause, EVSIDS decisions, Luby restarts, phase
+saving and deletion of learned clauses by LBD. All the clauses live in one
+flat array('i'): a clause is the offset of its size, followed by its
+literals. Literals are coded as 2 * var + (1 if negative else 0).
+"""
+import array
+import heapq
+import random
+import time
+
+TRUE = 1
+FALSE = -1
+
+
+class Unknown(object):
+    """
+    The type of UNKNOWN, what the solvers return instead of a model or None
+    when a limit runs out before they know the answer.
+    """
+    def __repr__(self):
+        return "UNKNOWN"
+
+    def __reduce__(self):  # Stays the same object through pickle
+        return "UNKNOWN"
+
+
+UNKNOWN = Unknown()
+
+
+def luby(i):
+    """
+    The i-th (from 0) element of 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8...
+    """
+    size = 1
+    seq = 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+def _code(lit):
+    return (lit << 1) if lit > 0 else ((-lit << 1) | 1)
+
+
+def _lit(code):
+    return -(code >> 1) if code & 1 else code >> 1
+
+
+class CDCLSolver(object):
+    restart_interval = 100  # Conflicts, times luby(restarts)
+    var_decay = 0.95
+    clause_decay = 0.999
+    learnts_factor = 1.0 / 3  # Of the original clauses, before a reduction
+    learnts_growth = 1.1
+
+    def __init__(self, clauses=(), seed=None):
+        self.arena = array.array("i")
+        self.watches = [[], []]  # Literal -> clauses to visit when it's false
+        self.value = [0, 0]  # Literal -> TRUE, FALSE or 0
+        self.level = [0]  # Variable -> decision level
+        self.reason = [-1]  # Variable -> clause that implied it, or -1
+        self.activity = [0.0]
+        self.polarity = [1]  # Variable -> saved phase (1 means negative)
+        self.seen = [0]
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.heap = []  # (-activity, variable), possibly stale
+        self.clauses = 0
+        self.learnts = []
+        self.lbd = {}
+        self.clause_activity = {}
+        self.wasted = 0
+        self.var_inc = 1.0
+        self.clause_inc = 1.0
+        self.max_learnts = None
+        self.conflicts = 0
+        self.propagations = 0
+        self.decisions = 0
+        self.ok = True
+        self.model = None
+        self.random = random.Random(seed) if seed is not None else None
+        for clause in clauses:
+            self.add_clause(clause)
+
+    @property
+    def variables(self):
+        return len(self.level) - 1
+
+    def _ensure(self, var):
+        while len(self.level) <= var:
+            v = len(self.level)
+            self.watches.extend(([], []))
+            self.value.extend((0, 0))
+            self.level.append(0)
+            self.reason.append(-1)
+            self.seen.append(0)
+            if self.random is None:
+                self.activity.append(0.0)
+                self.polarity.append(1)
+            else:
+                self.activity.append(self.random.random() * 1e-5)
+                self.polarity.append(self.random.getrandbits(1))
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def reserve(self, variables):
+        """
+        Make sure variables 1..variables exist, so models include them even
+        if no clause mentions them.
+        """
+        self._ensure(variables)
+
+    def set_phase(self, lit):
+        """
+        Make lit the first value tried for its variable (it gets overwritten
+        by phase saving once the variable is assigned).
+        """
+        self._ensure(abs(lit))
+        self.polarity[abs(lit)] = 1 if lit < 0 else 0
+
+    def add_clause(self, clause):
+        """
+        Returns False if the clauses became unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self._cancel(0)
+        codes = []
+        for lit in clause:
+            self._ensure(abs(lit))
+            code = _code(lit)
+            value = self.value[code]
+            if value == TRUE or code ^ 1 in codes:
+                return True
+            if value != FALSE and code not in codes:
+                codes.append(code)
+        if not codes:
+            self.ok = False
+        elif len(codes) == 1:
+            self._enqueue(codes[0], -1)
+            self.ok = self._propagate() == -1
+        else:
+            self._attach(codes)
+            self.clauses += 1
+        return self.ok
+
+    def _attach(self, codes):
+        c = len(self.arena)
+        self.arena.append(len(codes))
+        self.arena.extend(codes)
+        self.watches[codes[0]].append(c)
+        self.watches[codes[1]].append(c)
+        return c
+
+    def _enqueue(self, code, reason):
+        self.value[code] = TRUE
+        self.value[code ^ 1] = FALSE
+        var = code >> 1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(code)
+
+    def _propagate(self):
+        """
+        Returns the false clause if there is a conflict, -1 otherwise.
+        """
+        arena = self.arena
+        value = self.value
+        watches = self.watches
+        trail = self.trail
+        level = self.level
+        reason = self.reason
+        decision_level = len(self.trail_lim)
+        while self.qhead < len(trail):
+            false = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            watching = watches[false]
+            if not watching:
+                continue
+            watches[false] = kept = []
+            n = len(watching)
+            i = 0
+            while i < n:
+                c = watching[i]
+                i += 1
+                size = arena[c]
+                if size < 0:  # Deleted
+                    continue
+                first = arena[c + 1]
+                if first == false:
+                    first = arena[c + 2]
+                    arena[c + 1] = first
+                    arena[c + 2] = false
+                if value[first] == TRUE:
+                    kept.append(c)
+                    continue
+                for k in xrange(c + 3, c + 1 + size):
+                    lit = arena[k]
+                    if value[lit] != FALSE:
+                        arena[c + 2] = lit
+                        arena[k] = false
+                        watches[lit].append(c)
+                        break
+                else:
+                    kept.append(c)
+                    if value[first] == FALSE:
+                        kept.extend(watching[i:])
+                        self.qhead = len(trail)
+                        return c
+                    value[first] = TRUE
+                    value[first ^ 1] = FALSE
+                    level[first >> 1] = decision_level
+                    reason[first >> 1] = c
+                    trail.append(first)
+        return -1
+
+    def _analyze(self, conflict):
+        """
+        First UIP learning. Returns the learned clause (asserting literal
+        first, a literal of the backtrack level second) and backtrack level.
+        """
+        arena = self.arena
+        seen = self.seen
+        level = self.level
+        reason = self.reason
+        trail = self.trail
+        current = len(self.trail_lim)
+        learnt = [None]
+        marked = []
+        counter = 0
+        p = -1
+        index = len(trail) - 1
+        c = conflict
+        while True:
+            if c in self.clause_activity:
+                self._bump_clause(c)
+            start = c + 1 if p == -1 else c + 2
+            for k in xrange(start, c + 1 + arena[c]):
+                q = arena[k]
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = 1
+                    marked.append(v)
+                    self._bump_var(v)
+                    if level[v] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            c = reason[p >> 1]
+            seen[p >> 1] = 0
+            counter -= 1
+            if not counter:
+                break
+        learnt[0] = p ^ 1
+
+        # Drop the literals implied by the others
+        minimized = [learnt[0]]
+        for q in learnt[1:]:
+            c = reason[q >> 1]
+            if c == -1:
+                minimized.append(q)
+                continue
+            for k in xrange(c + 2, c + 1 + arena[c]):
+                v = arena[k] >> 1
+                if not seen[v] and level[v] > 0:
+                    minimized.append(q)
+                    break
+        for v in marked:
+            seen[v] = 0
+        learnt = minimized
+
+        backtrack = 0
+        if len(learnt) > 1:
+            best = 1
+            for i in xrange(2, len(learnt)):
+                if level[learnt[i] >> 1] > level[learnt[best] >> 1]:
+                    best = i
+            learnt[1], learnt[best] = learnt[best], learnt[1]
+            backtrack = level[learnt[1] >> 1]
+        return learnt, backtrack
+
+    def _bump_var(self, v):
+        activity = self.activity
+        activity[v] += self.var_inc
+        if activity[v] > 1e100:
+            for i in xrange(len(activity)):
+                activity[i] *= 1e-100
+            self.var_inc *= 1e-100
+            self._rebuild_heap()
+        elif not self.value[v << 1]:
+            heapq.heappush(self.heap, (-activity[v], v))
+
+    def _bump_clause(self, c):
+        activity = self.clause_activity
+        activity[c] += self.clause_inc
+        if activity[c] > 1e20:
+            for x in activity:
+                activity[x] *= 1e-20
+            self.clause_inc *= 1e-20
+
+    def _rebuild_heap(self):
+        self.heap = [(-self.activity[v], v) for v in xrange(1, len(self.level))
+                     if not self.value[v << 1]]
+        heapq.heapify(self.heap)
+
+    def _pick_branch(self):
+        heap = self.heap
+        activity = self.activity
+        value = self.value
+        if len(heap) > 4 * len(activity) + 100:
+            self._rebuild_heap()
+            heap = self.heap
+        while heap:
+            a, v = heapq.heappop(heap)
+            if not value[v << 1] and -a == activity[v]:
+                return (v << 1) | self.polarity[v]
+        return None
+
+    def _cancel(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        value = self.value
+        for code in self.trail[start:]:
+            v = code >> 1
+            value[code] = 0
+            value[code ^ 1] = 0
+            self.reason[v] = -1
+            self.polarity[v] = code & 1
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def _reduce_learnts(self):
+        """
+        Delete the worse half of the learned clauses (by LBD, then activity),
+        but never glue clauses or the reasons of current assignments.
+        """
+        arena = self.arena
+        locked = set(self.reason[code >> 1] for code in self.trail)
+        key = lambda c: (self.lbd[c], -self.clause_activity[c])
+        learnts = sorted(self.learnts, key=key)
+        half = len(learnts) // 2
+        kept = learnts[:half]
+        for c in learnts[half:]:
+            if self.lbd[c] <= 2 or c in locked:
+                kept.append(c)
+            else:
+                self.wasted += arena[c] + 1
+                arena[c] = -arena[c]
+                del self.lbd[c]
+                del self.clause_activity[c]
+        self.learnts = kept
+        if self.wasted > len(arena) // 2:
+            self._collect_garbage()
+
+    def _collect_garbage(self):
+        """
+        Compact the arena, dropping deleted clauses, and renumber them.
+        """
+        old = self.arena
+        arena = array.array("i")
+        moved = {}
+        c = 0
+        while c < len(old):
+            size = old[c]
+            if size > 0:
+                moved[c] = len(arena)
+                arena.extend(old[c:c + 1 + size])
+            c += 1 + abs(size)
+        self.arena = arena
+        self.wasted = 0
+        self.watches = [[moved[c] for c in xs if c in moved]
+                        for xs in self.watches]
+        self.reason = [moved.get(c, -1) for c in self.reason]
+        self.learnts = [moved[c] for c in self.learnts]
+        self.lbd = dict((moved[c], x) for c, x in self.lbd.iteritems())
+        self.clause_activity = dict((moved[c], x) for c, x in
+                                    self.clause_activity.iteritems())
+
+    def solve(self, assumptions=(), conflict_limit=None,
+              propagation_limit=None, deadline=None):
+        """
+        True if the clauses are satisfiable with the assumptions (literals)
+        true, then the model is in self.model, False if they are not and
+        None if a limit ran out first. `deadline` is a time.time() value.
+        The solver can be used again afterwards, learned clauses are kept.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        for lit in assumptions:
+            self._ensure(abs(lit))
+        assumptions = [_code(lit) for lit in assumptions]
+        if self.max_learnts is None:
+            self.max_learnts = max(self.clauses * self.learnts_factor, 1000)
+        limits = []
+        if conflict_limit is not None:
+            limits.append(lambda x=self.conflicts + conflict_limit:
+                          self.conflicts >= x)
+        if propagation_limit is not None:
+            limits.append(lambda x=self.propagations + propagation_limit:
+                          self.propagations >= x)
+        if deadline is not None:
+            limits.append(lambda: time.time() >= deadline)
+        restarts = 0
+        status = None
+        while status is None:
+            budget = luby(restarts) * self.restart_interval
+            restarts += 1
+            status = self._search(budget, assumptions, limits)
+            if status is None and any(limit() for limit in limits):
+                break
+        self._cancel(0)
+        return status
+
+    def probe(self, lits):
+        """
+        Propagate lits as if they were decisions. Returns the literals that
+        got assigned (lits included) or None if they lead to a conflict.
+        Nothing is kept afterwards.
+        """
+        if not self.ok:
+            return None
+        self._cancel(0)
+        start = len(self.trail)
+        try:
+            for lit in lits:
+                self._ensure(abs(lit))
+                code = _code(lit)
+                if self.value[code] == FALSE:
+                    return None
+                if self.value[code] == TRUE:
+                    continue
+                self.trail_lim.append(len(self.trail))
+                self._enqueue(code, -1)
+                if self._propagate() != -1:
+                    return None
+            return [_lit(code) for code in self.trail[start:]]
+        finally:
+            self._cancel(0)
+
+    def iter_models(self, project, assumptions=(), guard=None):
+        """
+        Yield models that differ on the variables in project, blocking each
+        one before looking for the next.
+        If guard is a variable, the blocking clauses only apply while it is
+        assumed true, and they are retired when the iteration ends, so the
+        solver can still be used for other queries.
+        """
+        assumptions = list(assumptions)
+        self.reserve(max(project or [0]))
+        if guard is not None:
+            self.reserve(guard)
+            assumptions.append(guard)
+        try:
+            while self.solve(assumptions):
+                model = self.model
+                yield model
+                block = [-model[var - 1] for var in project]
+                if guard is not None:
+                    block.append(-guard)
+                if not self.add_clause(block):
+                    break
+        finally:
+            if guard is not None:
+                self.add_clause([-guard])
+
+    def _search(self, budget, assumptions, limits):
+        value = self.value
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict != -1:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, backtrack = self._analyze(conflict)
+                self._cancel(backtrack)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], -1)
+                else:
+                    c = self._attach(learnt)
+                    self.learnts.append(c)
+                    self.lbd[c] = len(set(self.level[x >> 1] for x in learnt))
+                    self.clause_activity[c] = self.clause_inc
+                    self._enqueue(learnt[0], c)
+                self.var_inc /= self.var_decay
+                self.clause_inc /= self.clause_decay
+                if limits and any(limit() for limit in limits):
+                    self._cancel(0)
+                    return None
+                continue
+            if conflicts >= budget:
+                self._cancel(0)
+                return None
+            if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                self._reduce_learnts()
+                self.max_learnts *= self.learnts_growth
+            decision = None
+            while len(self.trail_lim) < len(assumptions):
+                p = assumptions[len(self.trail_lim)]
+                if value[p] == TRUE:  # Already true, open an empty level
+                    self.trail_lim.append(len(self.trail))
+                elif value[p] == FALSE:
+                    return False
+                else:
+                    decision = p
+                    break
+            if decision is None:
+                decision = self._pick_branch()
+                if decision is None:
+                    self.model = [v if value[v << 1] == TRUE else -v
+                                  for v in xrange(1, len(self.level))]
+                    return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(decision, -1)
+
+
+def cdcl_solve(clauses, assumptions=(), phases=(), seed=None,
+               conflict_limit=None, propagation_limit=None, deadline=None):
+    """
+    Same contract as pycosat_solve: a model as a list of literals, None if
+    the clauses are unsatisfiable (with the assumptions true) or UNKNOWN if
+    a limit ran out, see CDCLSolver.solve.
+    `phases` are literals to try first, `seed` randomizes the initial
+    variable order and phases.
+    """
+    solver = CDCLSolver(seed=seed)
+    for clause in clauses:
+        if not solver.add_clause(clause):
+            return None
+    for lit in phases:
+        solver.set_phase(lit)
+    result = solver.solve(assumptions, conflict_limit, propagation_limit,
+                          deadline)
+    if result:
+        return solver.model
+    if result is None:
+        return UNKNOWN
+    return None
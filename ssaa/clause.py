@@ -2,22 +2,47 @@
 import bitarray
 
 from solver import simplify_clauses, pycosat_solve, assignment_to_clauses, \
-                   lits_to_assignment
-from propositional_logic import UnassignedSymbol
+                   lits_to_assignment, iter_vars, make_limits, add_symbols
+from propositional_logic import UnassignedSymbol, DISTRIBUTE, \
+                               iter_int_clauses, iter_symbols, Constant
+from cdcl import CDCLSolver, UNKNOWN
+from clausedb import ClauseDB
+from sat_arithmetic import IntegerExpression
 
 
 class Claused(object):
+    """
+    With incremental=True, solve() keeps one CDCLSolver session: the
+    assignment goes in as assumptions, add_constraint adds clauses to it
+    and what it learns carries over to the next call.
+    The simplified clauses are kept in a ClauseDB. The bits of the
+    relevant_io expressions get a value even if the formula doesn't have
+    them.
+    """
     relevant_io = {}
+    _session = None
 
-    def __init__(self, formula, relevant_io=None):
+    def __init__(self, formula, relevant_io=None, encoding=DISTRIBUTE,
+                 incremental=False):
         if relevant_io is None:
             relevant_io = {}
+        symbols = list(iter_symbols(formula))
         for value in relevant_io.values():
             value.childs = []
+            symbols.extend(value.get_symbols())
         self.relevant_io = relevant_io
-        self.clauses, self.names, self.reverse = formula.to_cnf().to_clauses()
-        self.clauses, self.partial, self.free = simplify_clauses(self.clauses)
-        self.rebuild_assignment()
+        self.encoding = encoding
+        self.incremental = incremental
+        if encoding == DISTRIBUTE:
+            formula = formula.to_cnf()
+        clauses, self.names, self.reverse = formula.to_clauses(encoding)
+        self._set_clauses(clauses)
+        self.free.update(add_symbols(symbols, self.names, self.reverse))
+        self.reset_assignment()
+
+    def _set_clauses(self, clauses):
+        clauses, self.partial, self.free = simplify_clauses(clauses)
+        self.clauses = ClauseDB(clauses)
 
     def reset_assignment(self):
         self.assignment = lits_to_assignment(self.partial, self.reverse)
@@ -49,19 +74,137 @@ class Claused(object):
     def simplify(self):
         clauses = self.clauses + \
                   assignment_to_clauses(self.assignment, self.names)
-        self.clauses, self.partial, self.free = simplify_clauses(clauses)
+        self._set_clauses(clauses)
+        self._session = None
         self.reset_assignment()
 
-    def solve(self, solver=pycosat_solve):
+    def add_constraint(self, formula):
+        """
+        Require the formula to be true too. New symbols get new variables.
+        """
+        if self.encoding == DISTRIBUTE:
+            formula = formula.to_cnf()
+        size = len(self.reverse)
+        clauses = list(iter_int_clauses(formula, self.names, self.reverse,
+                                        self.encoding))
+        if self._session is not None and len(self.reverse) > size and \
+                self._session[0].variables >= size:
+            # The new variables are taken in the session (see iter_solutions)
+            self._session = None
+        self.add_clauses(clauses)
+
+    def add_clauses(self, clauses):
+        self.clauses.extend(clauses)
+        if self._session is not None:
+            solver, variables = self._session
+            for clause in clauses:
+                solver.add_clause(clause)
+            variables.update(iter_vars(clauses))
+
+    def solve(self, solver=None, propagation_limit=None, conflict_limit=None,
+              deadline=None):
+        """
+        `solver` defaults to the incremental session if the Claused is
+        incremental, to pycosat_solve otherwise.
+        Returns UNKNOWN if one of the limits (see solver.solve) runs out.
+        """
+        limits = make_limits(propagation_limit, conflict_limit, deadline)
+        if solver is None and self.incremental:
+            return self._solve_incremental(limits)
+        if solver is None:
+            solver = pycosat_solve
         clauses = self.clauses + \
                   assignment_to_clauses(self.assignment, self.names)
-        model = solver(clauses)
+        model = solver(clauses, **limits)
+        if model is UNKNOWN:
+            return UNKNOWN
         if model is None:
             return False
         model = lits_to_assignment(model, self.reverse)
         self.assignment = model
         return True
 
+    def _get_session(self):
+        if self._session is None:
+            variables = set(iter_vars(self.clauses))
+            self._session = CDCLSolver(self.clauses), variables
+        return self._session
+
+    def _split_assignment(self, variables):
+        """
+        The assignment as literals, those of `variables` (to be assumed) and
+        the rest, which can't conflict with anything.
+        """
+        assumptions = []
+        rest = []
+        for clause in assignment_to_clauses(self.assignment, self.names):
+            lit = clause[0]
+            if abs(lit) in variables:
+                assumptions.append(lit)
+            else:
+                rest.append(lit)
+        return assumptions, rest
+
+    def _solve_incremental(self, limits):
+        solver, variables = self._get_session()
+        assumptions, rest = self._split_assignment(variables)
+        result = solver.solve(assumptions, **limits)
+        if result is None:
+            return UNKNOWN
+        if not result:
+            return False
+        model = lits_to_assignment((lit for lit in solver.model
+                                    if abs(lit) < len(self.reverse)),
+                                   self.reverse)
+        model.update(lits_to_assignment(rest, self.reverse))
+        self.assignment = model
+        return True
+
+    def iter_solutions(self, names=None):
+        """
+        Yield {name: value} for every distinct combination of values of the
+        relevant_io in names (all of them by default) that is consistent
+        with the current assignment.
+        An incremental Claused enumerates on its session, with the blocking
+        clauses retired afterwards.
+        """
+        if names is None:
+            names = sorted(self.relevant_io)
+        if self.incremental:
+            solver, variables = self._get_session()
+        else:
+            solver = CDCLSolver(self.clauses)
+            variables = set(iter_vars(self.clauses))
+        # Bits that are not in the clauses and the guard get variables past
+        # those of the Claused and of the session, so names and reverse
+        # (and the layout of dump) stay the same
+        reverse = self.reverse + [None] * (solver.variables + 1 -
+                                           len(self.reverse))
+        extra = {}
+        project = []
+        for name in names:
+            io = self.relevant_io[name]
+            bits = io.bits if isinstance(io, IntegerExpression) else [io.bit]
+            for bit in bits:
+                if isinstance(bit, Constant):
+                    continue
+                if bit not in self.names and bit not in extra:
+                    extra[bit] = len(reverse)
+                    reverse.append(bit)
+                project.append(self.names.get(bit) or extra[bit])
+        guard = None
+        if self.incremental:
+            guard = len(reverse)
+            reverse.append(None)
+        assumptions, rest = self._split_assignment(variables | set(project))
+        for model in solver.iter_models(project, assumptions, guard):
+            assignment = lits_to_assignment((lit for lit in model
+                                             if reverse[abs(lit)] is not None),
+                                            reverse)
+            assignment.update(lits_to_assignment(rest, self.reverse))
+            yield dict((name, self.relevant_io[name].recover_value(assignment))
+                       for name in names)
+
     def dump(self, fout):
         a = bitarray.bitarray()
         it = iter(self.reverse)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+ClauseDB keeps clauses flat: the literals of all of them in one array('i')
+and, in another array, the offset where each one starts (plus the end of
+the last one). That is about 4 bytes per literal instead of a list object
+per clause and an int object per literal, and nothing for the garbage
+collector to walk.
+
+It behaves as a sequence of clauses (lists of ints), so it can be passed
+wherever a list of clauses is taken. The counting and filtering methods
+work on the whole buffers at once, with NumPy when it is available.
+"""
+import array
+import itertools
+
+try:
+    import numpy
+except ImportError:  # The methods fall back to loops over the arrays
+    numpy = None
+
+
+class ClauseDB(object):
+    def __init__(self, clauses=()):
+        self.literals = array.array("i")
+        self.offsets = array.array("l", [0])
+        self.extend(clauses)
+
+    @classmethod
+    def from_arrays(cls, literals, offsets):
+        """
+        Build from the buffers themselves (sequences, arrays or NumPy
+        arrays); offsets starts with 0 and ends with len(literals).
+        """
+        db = cls()
+        if numpy is not None and isinstance(literals, numpy.ndarray):
+            db.literals = array.array("i", literals.astype(
+                numpy.dtype("i")).tostring())
+        else:
+            db.literals = array.array("i", literals)
+        if numpy is not None and isinstance(offsets, numpy.ndarray):
+            db.offsets = array.array("l", offsets.astype(
+                numpy.dtype("l")).tostring())
+        else:
+            db.offsets = array.array("l", offsets)
+        if not db.offsets or db.offsets[0] != 0 or \
+                db.offsets[-1] != len(db.literals):
+            raise ValueError("Offsets do not cover the literals")
+        return db
+
+    def append(self, clause):
+        self.literals.extend(clause)
+        self.offsets.append(len(self.literals))
+
+    def extend(self, clauses):
+        if isinstance(clauses, ClauseDB):
+            base = len(self.literals)
+            self.literals.extend(clauses.literals)
+            self.offsets.extend(base + x for x in clauses.offsets[1:])
+            return
+        for clause in clauses:
+            self.append(clause)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ClauseDB(self[j] for j in xrange(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ClauseDB index out of range")
+        return self.literals[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def __iter__(self):
+        literals = self.literals
+        start = 0
+        for end in itertools.islice(self.offsets, 1, None):
+            yield literals[start:end].tolist()
+            start = end
+
+    def __contains__(self, clause):
+        clause = list(clause)
+        if not clause:
+            return 0 in self.lengths()
+        return any(x == clause for x in self)
+
+    def __add__(self, other):
+        result = ClauseDB(self)
+        result.extend(other)
+        return result
+
+    def __radd__(self, other):
+        result = ClauseDB(other)
+        result.extend(self)
+        return result
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __eq__(self, other):
+        if isinstance(other, ClauseDB):
+            return self.literals == other.literals and \
+                   self.offsets == other.offsets
+        try:
+            return len(self) == len(other) and \
+                   all(a == list(b) for a, b in itertools.izip(self, other))
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None  # Mutable
+
+    def __repr__(self):
+        return "ClauseDB({!r})".format(list(self))
+
+    @property
+    def nbytes(self):
+        return len(self.literals) * self.literals.itemsize + \
+               len(self.offsets) * self.offsets.itemsize
+
+    def _arrays(self):
+        """
+        NumPy views of the buffers (no copies).
+        """
+        return (numpy.frombuffer(self.literals, numpy.dtype("i")),
+                numpy.frombuffer(self.offsets, numpy.dtype("l")))
+
+    def lengths(self):
+        if numpy is not None:
+            return numpy.diff(self._arrays()[1]).tolist()
+        offsets = self.offsets
+        return [offsets[i + 1] - offsets[i] for i in xrange(len(self))]
+
+    def max_variable(self):
+        if not self.literals:
+            return 0
+        return max(max(self.literals), -min(self.literals))
+
+    def literal_counts(self):
+        """
+        Occurrences of each literal, as two lists indexed by variable (0 is
+        unused): the positive and the negative ones.
+        """
+        size = self.max_variable() + 1
+        if numpy is not None:
+            literals = self._arrays()[0]
+            positive = numpy.bincount(literals[literals > 0], minlength=size)
+            negative = numpy.bincount(-literals[literals < 0],
+                                      minlength=size)
+            return positive.tolist(), negative.tolist()
+        positive = [0] * size
+        negative = [0] * size
+        for lit in self.literals:
+            if lit > 0:
+                positive[lit] += 1
+            else:
+                negative[-lit] += 1
+        return positive, negative
+
+    def variable_counts(self):
+        """
+        Occurrences of each variable, as a list indexed by variable.
+        """
+        positive, negative = self.literal_counts()
+        return [a + b for a, b in itertools.izip(positive, negative)]
+
+    def variables(self):
+        """
+        The set of variables that appear.
+        """
+        if numpy is not None:
+            return set(numpy.unique(numpy.abs(self._arrays()[0])).tolist())
+        return set(abs(lit) for lit in self.literals)
+
+    def filter(self, keep):
+        """
+        A new ClauseDB with the clauses whose entry in `keep` (one boolean
+        per clause) is true.
+        """
+        if numpy is not None:
+            literals, offsets = self._arrays()
+            keep = numpy.asarray(keep, dtype=bool)
+            lengths = numpy.diff(offsets)
+            mask = numpy.repeat(keep, lengths)
+            return ClauseDB.from_arrays(literals[mask], numpy.concatenate(
+                ([0], numpy.cumsum(lengths[keep]))))
+        result = ClauseDB()
+        for clause, kept in itertools.izip(self, keep):
+            if kept:
+                result.append(clause)
+        return result
+
+    def reduce(self, lits):
+        """
+        A new ClauseDB for the literals in `lits` being true: the clauses
+        they satisfy are left out and the literals they falsify dropped
+        (a clause can end up empty).
+        """
+        lits = set(lits)
+        if numpy is None or not self.literals:
+            result = ClauseDB()
+            for clause in self:
+                if not any(lit in lits for lit in clause):
+                    result.append([lit for lit in clause
+                                   if -lit not in lits])
+            return result
+        literals, offsets = self._arrays()
+        size = max(self.max_variable(), max([abs(x) for x in lits] or [0]))
+        values = numpy.zeros(size + 1, dtype=numpy.int8)
+        for lit in lits:
+            values[abs(lit)] = 1 if lit > 0 else -1
+        values = values[numpy.abs(literals)] * numpy.sign(literals)
+        lengths = numpy.diff(offsets)
+        clause_of = numpy.repeat(numpy.arange(len(self)), lengths)
+        satisfied = numpy.zeros(len(self), dtype=bool)
+        satisfied[clause_of[values > 0]] = True
+        kept = (values == 0) & ~satisfied[clause_of]
+        lengths = numpy.bincount(clause_of[kept], minlength=len(self))
+        return ClauseDB.from_arrays(literals[kept], numpy.concatenate(
+            ([0], numpy.cumsum(lengths[~satisfied]))))
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader and writer for DIMACS CNF files, and a reader for solver
+output in the SAT competition format ("s ..." and "v ..." lines).
+
+Files are read in large blocks and written in batches of lines, so the
+instance never has to be in memory as one string. Files whose name ends
+in .gz (or, when reading, that start with the gzip magic number) are
+compressed and decompressed on the fly.
+"""
+import gzip
+import io
+
+try:
+    import numpy
+except ImportError:  # Blocks are parsed with int() instead
+    numpy = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+BLOCK_SIZE = 1 << 20
+BATCH_SIZE = 4096  # Lines per write
+_NUMBER_CHARACTERS = b"0123456789- \t\r\n"
+
+
+def open_dimacs(filename, mode="r"):
+    """
+    Open a DIMACS file in binary mode ("r", "w" or "a"), through gzip when
+    it is compressed.
+    """
+    mode = mode.replace("b", "") + "b"
+    if mode == "rb":
+        with open(filename, "rb") as fin:
+            gzipped = fin.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    else:
+        gzipped = filename.endswith(".gz")
+    if gzipped:
+        return gzip.open(filename, mode)
+    return io.open(filename, mode, buffering=BLOCK_SIZE)
+
+
+class DimacsReader(object):
+    """
+    Iterating over it yields the clauses (lists of ints) of a DIMACS CNF
+    file object; clauses can span several lines and the last 0 can be
+    missing. Once the "p cnf" line was read its counts are in variables and
+    clauses (None before). The text of the comments is in comments.
+    """
+    def __init__(self, fin, block_size=BLOCK_SIZE):
+        self.fin = fin
+        self.block_size = block_size
+        self.variables = None
+        self.clauses = None
+        self.comments = []
+        self._done = False
+
+    def __iter__(self):
+        clause = []
+        rest = b""
+        while not self._done:
+            block = self.fin.read(self.block_size)
+            if not block:
+                block, rest = rest, b""
+                if not block:
+                    break
+            else:
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                block, rest = block[:end], block[end:]
+            numbers = self._numbers(block)
+            start = 0
+            while True:
+                try:
+                    end = numbers.index(0, start)
+                except ValueError:
+                    break
+                clause.extend(numbers[start:end])
+                yield clause
+                clause = []
+                start = end + 1
+            clause.extend(numbers[start:])
+        if clause:
+            yield clause
+
+    def _numbers(self, block):
+        if b"c" not in block and b"p" not in block and b"%" not in block:
+            if numpy is not None and \
+                    not block.translate(None, _NUMBER_CHARACTERS):
+                return numpy.fromstring(block, numpy.int64, sep=" ").tolist()
+            return map(int, block.split())
+        numbers = []
+        for line in block.splitlines():
+            line = line.strip()
+            first = line[:1]
+            if first == b"c":
+                self.comments.append(line[1:].strip())
+            elif first == b"p":
+                self._header(line)
+            elif first == b"%":  # End of the file in the SATLIB instances
+                self._done = True
+                break
+            elif line:
+                numbers.extend(map(int, line.split()))
+        return numbers
+
+    def _header(self, line):
+        fields = line.split()
+        if len(fields) != 4 or fields[1] != b"cnf":
+            raise ValueError("Bad DIMACS header {!r}".format(line))
+        self.variables = int(fields[2])
+        self.clauses = int(fields[3])
+
+
+def read_dimacs(fin):
+    """
+    All the clauses of a DIMACS CNF file object, in a list.
+    """
+    return list(DimacsReader(fin))
+
+
+def write_clauses(fout, clauses):
+    """
+    Write the clause lines (without header) in batches.
+    """
+    lines = []
+    for clause in clauses:
+        lines.append(" ".join(map(str, clause)) + " 0\n")
+        if len(lines) == BATCH_SIZE:
+            fout.write("".join(lines))
+            lines = []
+    if lines:
+        fout.write("".join(lines))
+
+
+def write_dimacs(fout, clauses, variables=None, comments=("ssaa",)):
+    """
+    Write a DIMACS CNF file. clauses has to be a sequence; if variables is
+    None it is gone through twice.
+    """
+    if variables is None:
+        variables = max([abs(lit) for clause in clauses
+                         for lit in clause] or [0])
+    for comment in comments:
+        fout.write("c {}\n".format(comment))
+    fout.write("p cnf {} {}\n".format(variables, len(clauses)))
+    write_clauses(fout, clauses)
+
+
+def read_solution(fin):
+    """
+    Parse solver output in the SAT competition format. Returns True and the
+    literals of the "v" lines if the instance is satisfiable, False and []
+    if it is not and None and [] if the solver did not know (or there is no
+    "s" line).
+    """
+    status = None
+    model = []
+    for line in fin:
+        if line.startswith(b"s "):
+            status = line[2:].strip()
+        elif line.startswith(b"v ") or line.strip() == b"v":
+            model.extend(lit for lit in map(int, line[1:].split()) if lit)
+    if status == b"SATISFIABLE":
+        return True, model
+    if status == b"UNSATISFIABLE":
+        return False, []
+    return None, []
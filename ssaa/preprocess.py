@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+CNF preprocessing: equivalent literal substitution, subsumption,
+self-subsuming resolution and bounded variable elimination, run to a
+fixpoint together with unit propagation.
+
+Every clause that goes away without being implied by the ones left is kept
+in a stack together with its pivot literal. extend_model walks the stack
+backwards and flips the pivot of every clause the model does not satisfy,
+which turns a model of the preprocessed clauses into one of the originals.
+"""
+
+
+class Preprocessor(object):
+    """
+    Variables in `frozen` are neither substituted nor eliminated, so they
+    can still be used in assumptions or cubes afterwards.
+    """
+    resolvent_limit = 20  # Longest resolvent variable elimination may add
+    occurrence_limit = 10  # Skip variables with more clauses on both sides
+    max_rounds = 5
+
+    def __init__(self, clauses, frozen=()):
+        self.clauses = []  # Index -> list of literals, None once removed
+        self.occurs = {}  # Literal -> set of clause indexes
+        self.frozen = set(abs(lit) for lit in frozen)
+        self.variables = set()
+        self.values = {}  # Variable -> literal, for the units found
+        self.stack = []  # (pivot, clause), for extend_model
+        self.units = []
+        self.touched = set()  # Clauses added or changed since the last pass
+        self.ok = True
+        for clause in clauses:
+            self.variables.update(abs(lit) for lit in clause)
+            self.add(clause)
+
+    def add(self, clause):
+        lits = []
+        for lit in clause:
+            if -lit in lits:
+                return
+            if lit not in lits:
+                lits.append(lit)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.units.append(lits[0])
+        else:
+            index = len(self.clauses)
+            self.clauses.append(lits)
+            for lit in lits:
+                self.occurs.setdefault(lit, set()).add(index)
+            self.touched.add(index)
+
+    def _remove(self, index):
+        clause = self.clauses[index]
+        for lit in clause:
+            self.occurs[lit].discard(index)
+        self.clauses[index] = None
+        self.touched.discard(index)
+        return clause
+
+    def _strengthen(self, index, lit):
+        """
+        Remove lit from the clause.
+        """
+        clause = self._remove(index)
+        clause.remove(lit)
+        self.add(clause)
+
+    def _occurrences(self, lit):
+        return self.occurs.get(lit, ())
+
+    def propagate(self):
+        while self.units and self.ok:
+            lit = self.units.pop()
+            value = self.values.get(abs(lit))
+            if value is not None:
+                if value != lit:
+                    self.ok = False
+                continue
+            self.values[abs(lit)] = lit
+            self.stack.append((lit, [lit]))
+            for index in list(self._occurrences(lit)):
+                self._remove(index)
+            for index in list(self._occurrences(-lit)):
+                self._strengthen(index, -lit)
+
+    def substitute_equivalences(self):
+        """
+        Literals in the same strongly connected component of the binary
+        implication graph are equivalent; replace each one by the
+        component's representative. Returns True if something changed.
+        """
+        graph = {}
+        for clause in self.clauses:
+            if clause is not None and len(clause) == 2:
+                a, b = clause
+                graph.setdefault(-a, []).append(b)
+                graph.setdefault(-b, []).append(a)
+        substitutions = {}
+        for component in _strongly_connected_components(graph):
+            variables = set(abs(lit) for lit in component)
+            if len(variables) < len(component):  # Both x and -x
+                self.ok = False
+                return False
+            rep = min(component, key=lambda x: (abs(x) not in self.frozen,
+                                                abs(x)))
+            for lit in component:
+                var = abs(lit)
+                if var == abs(rep) or var in self.frozen or \
+                        var in substitutions:
+                    continue
+                substitutions[var] = rep if lit > 0 else -rep
+        for var, lit in substitutions.iteritems():
+            self.stack.append((var, [var, -lit]))
+            self.stack.append((-var, [-var, lit]))
+            for index in list(self._occurrences(var)) + \
+                    list(self._occurrences(-var)):
+                clause = self._remove(index)
+                self.add([_substitute(x, substitutions) for x in clause])
+        return bool(substitutions)
+
+    def subsume(self):
+        """
+        Backward subsumption and self-subsuming resolution from the clauses
+        touched since the last call, shortest first.
+        """
+        while self.touched and self.ok:
+            queue = sorted(self.touched,
+                           key=lambda i: len(self.clauses[i]))
+            self.touched = set()
+            for index in queue:
+                if self.clauses[index] is not None:
+                    self._subsume_with(index)
+                self.propagate()
+                if not self.ok:
+                    return
+
+    def _subsume_with(self, index):
+        clause = self.clauses[index]
+        best = min(clause, key=lambda lit: len(self._occurrences(lit)) +
+                                           len(self._occurrences(-lit)))
+        for lit in (best, -best):
+            for other in list(self._occurrences(lit)):
+                if other == index or self.clauses[other] is None:
+                    continue
+                lits = self.clauses[other]
+                if len(lits) < len(clause):
+                    continue
+                lits = set(lits)
+                missing = [x for x in clause if x not in lits]
+                if not missing:
+                    self._remove(other)
+                elif len(missing) == 1 and -missing[0] in lits:
+                    self._strengthen(other, -missing[0])
+
+    def eliminate(self, var):
+        """
+        Replace the clauses of var by their resolvents if there are no more
+        of them. Returns True if var was eliminated.
+        """
+        positive = list(self._occurrences(var))
+        negative = list(self._occurrences(-var))
+        if len(positive) > self.occurrence_limit and \
+                len(negative) > self.occurrence_limit:
+            return False
+        resolvents = []
+        bound = len(positive) + len(negative)
+        for i in positive:
+            clause = [x for x in self.clauses[i] if x != var]
+            for j in negative:
+                resolvent = set(clause)
+                for lit in self.clauses[j]:
+                    if lit != -var:
+                        resolvent.add(lit)
+                if any(-lit in resolvent for lit in resolvent):
+                    continue
+                if len(resolvent) > self.resolvent_limit:
+                    return False
+                resolvents.append(list(resolvent))
+                if len(resolvents) > bound:
+                    return False
+        for i in positive:
+            self.stack.append((var, self._remove(i)))
+        for j in negative:
+            self.stack.append((-var, self._remove(j)))
+        for resolvent in resolvents:
+            self.add(resolvent)
+        return True
+
+    def eliminate_variables(self):
+        """
+        Try every variable, the ones in fewer clauses first. Returns True
+        if some was eliminated.
+        """
+        def cost(var):
+            return len(self._occurrences(var)) * \
+                   len(self._occurrences(-var))
+        candidates = set(abs(lit) for lit, indexes in
+                         self.occurs.iteritems() if indexes)
+        candidates -= self.frozen
+        changed = False
+        for var in sorted(candidates, key=cost):
+            if self.eliminate(var):
+                changed = True
+                self.propagate()
+                if not self.ok:
+                    break
+        return changed
+
+    def run(self):
+        """
+        Returns the preprocessed clauses, [[]] if they are unsatisfiable.
+        """
+        self.propagate()
+        for _ in xrange(self.max_rounds):
+            if not self.ok:
+                break
+            changed = self.substitute_equivalences()
+            self.propagate()
+            self.subsume()
+            if self.ok and self.eliminate_variables():
+                changed = True
+            self.subsume()
+            if not changed:
+                break
+        if not self.ok:
+            return [[]]
+        clauses = [[lit] for var, lit in self.values.iteritems()
+                   if var in self.frozen]
+        clauses.extend(list(x) for x in self.clauses if x is not None)
+        return clauses
+
+    def extend_model(self, model):
+        """
+        Turn a model (list of literals) of the clauses run returned into a
+        model of the original ones.
+        """
+        values = dict((abs(lit), lit > 0) for lit in model)
+        for pivot, clause in reversed(self.stack):
+            if not any(values.get(abs(lit), False) is (lit > 0)
+                       for lit in clause):
+                values[abs(pivot)] = pivot > 0
+        variables = self.variables.union(values)
+        return [var if values.get(var, False) else -var
+                for var in sorted(variables)]
+
+
+def _substitute(lit, substitutions):
+    rep = substitutions.get(abs(lit))
+    if rep is None:
+        return lit
+    return rep if lit > 0 else -rep
+
+
+def _strongly_connected_components(graph):
+    """
+    Tarjan's algorithm with an explicit stack. Only components with more
+    than one node are returned.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        lit = stack.pop()
+                        on_stack.discard(lit)
+                        component.append(lit)
+                        if lit == node:
+                            break
+                    if len(component) > 1:
+                        components.append(component)
+    return components
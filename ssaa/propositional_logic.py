@@ -1,12 +1,93 @@
 # -*- coding: utf-8 -*-
 import itertools
+import weakref
+
+try:
+    import numpy
+except ImportError:  # Only needed for packed (batch) evaluation
+    numpy = None
+
+DISTRIBUTE = "distribute"
+TSEITIN = "tseitin"
+PLAISTED_GREENBAUM = "plaisted-greenbaum"
+AND_INVERTER = "and-inverter"
+
+POSITIVE = 1
+NEGATIVE = 2
+BOTH = POSITIVE | NEGATIVE
 
 
 class UnassignedSymbol(Exception):
     pass
 
 
+# Unique table: structurally identical formulas are the same object.
+_unique = weakref.WeakValueDictionary()
+
+# TRUE and FALSE, the only two Constants.
+_constants = {}
+
+# Symbol registry: every live Symbol by its integer id.
+_symbols = weakref.WeakValueDictionary()
+_last_symbol_id = 0
+
+
+def _hash_cons(cls, args):
+    key = (cls,) + args
+    node = _unique.get(key)
+    if node is None:
+        node = object.__new__(cls)
+        node.args = args
+        _unique[key] = node
+    return node
+
+
+def _flatten(cls, args):
+    xs = []
+    for x in args:
+        if isinstance(x, cls):
+            xs.extend(x.args)
+        else:
+            xs.append(x)
+    return tuple(xs)
+
+
+def _complement(formula):
+    """
+    The negation of the formula if it already exists, None otherwise.
+    """
+    if isinstance(formula, Not):
+        return formula.args[0]
+    return _unique.get((Not, formula))
+
+
+def _simplify_junction(cls, args, unit, zero, dual):
+    """
+    Arguments of an And (or Or) after flattening, removing duplicates and
+    `unit` and applying absorption, or `zero` if the whole thing folds to it.
+    """
+    xs = []
+    seen = set()
+    for x in _flatten(cls, args):
+        if x is zero:
+            return zero
+        if x is unit or x in seen:
+            continue
+        if _complement(x) in seen:  # x and -x
+            return zero
+        xs.append(x)
+        seen.add(x)
+    if not xs:
+        return unit
+    if len(xs) > 1:  # x and (x or y) is x
+        xs = [x for x in xs if not isinstance(x, dual) or
+                               not any(y in seen for y in x.args)]
+    return tuple(xs)
+
+
 class Formula(object):
+    __slots__ = ("__weakref__", "_shape", "_cache")
+
     def evaluate(self, assignment):
         pass
 
@@ -16,7 +97,7 @@ class Formula(object):
         if isinstance(b, Or):
             a, b = b, a
         if isinstance(a, Or):
-            args = [b]
+            args = (b,)
             if isinstance(b, Or):
                 args = b.args
             return Or(*(a.args + args))
@@ -32,14 +113,49 @@ class Formula(object):
     def __neg__(self):
         return Not(self)
 
-    def to_cnf(self):
-        return to_cnf(self)
+    def to_cnf(self, encoding=DISTRIBUTE):
+        return to_cnf(self, encoding)
 
-    def to_clauses(self):
-        return to_clauses(self)
+    def to_clauses(self, encoding=DISTRIBUTE):
+        return to_clauses(self, encoding)
+
+    def compile(self):
+        return compile_formula(self)
+
+    def __reduce__(self):
+        return self.__class__, self.args
 
 
 class Symbol(Formula):
+    """
+    A propositional variable. Symbols are numbered 1, 2, ... in creation
+    order, Symbol(id) returns the symbol with that id (creating it if needed).
+    Ids only mean something inside one process: unpickling gives a new
+    Symbol for each distinct pickled one (as binary_format.load does).
+    """
+    __slots__ = ("id",)
+
+    def __new__(cls, id=None):
+        global _last_symbol_id
+        if id is None:
+            id = _last_symbol_id + 1
+        symbol = _symbols.get(id)
+        if symbol is None:
+            symbol = object.__new__(cls)
+            symbol.id = id
+            _symbols[id] = symbol
+            _last_symbol_id = max(_last_symbol_id, id)
+        return symbol
+
+    def __reduce__(self):
+        return Symbol, ()  # Pickle memoizes it, so it is one per load
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def evaluate(self, assignment):
         if self not in assignment:
             raise UnassignedSymbol(self)
@@ -48,49 +164,88 @@ class Symbol(Formula):
         return v
 
 
+class Constant(Formula):
+    """
+    TRUE or FALSE. The other constructors fold them away, so they only show up
+    as a whole formula.
+    """
+    __slots__ = ("value",)
+    args = ()
+
+    def __new__(cls, value):
+        value = bool(value)
+        constant = _constants.get(value)
+        if constant is None:
+            constant = _constants[value] = object.__new__(cls)
+            constant.value = value
+        return constant
+
+    def __reduce__(self):
+        return "TRUE" if self.value else "FALSE"
+
+    def evaluate(self, assignment):
+        return self.value
+
+
 class And(Formula):
-    def __init__(self, *args):
+    __slots__ = ("args",)
+
+    def __new__(cls, *args):
         if not args:
             raise ValueError("Empty range And not allowed.")
-        xs = []
-        for x in args:
-            if isinstance(x, And):
-                xs.extend(x.args)
-            else:
-                xs.append(x)
-        self.args = xs
+        args = _simplify_junction(cls, args, TRUE, FALSE, Or)
+        if isinstance(args, Constant):
+            return args
+        if len(args) == 1:
+            return args[0]
+        return _hash_cons(cls, args)
 
     def evaluate(self, assignment):
         return all([x.evaluate(assignment) for x in self.args])
 
 
 class Or(Formula):
-    def __init__(self, *args):
+    __slots__ = ("args",)
+
+    def __new__(cls, *args):
         if not args:
             raise ValueError("Empty range Or not allowed.")
-        xs = []
-        for x in args:
-            if isinstance(x, Or):
-                xs.extend(x.args)
-            else:
-                xs.append(x)
-        self.args = xs
+        args = _simplify_junction(cls, args, FALSE, TRUE, And)
+        if isinstance(args, Constant):
+            return args
+        if len(args) == 1:
+            return args[0]
+        return _hash_cons(cls, args)
 
     def evaluate(self, assignment):
         return any([x.evaluate(assignment) for x in self.args])
 
 
 class Not(Formula):
-    def __init__(self, expr):
-        self.args = [expr]
+    __slots__ = ("args",)
+
+    def __new__(cls, expr):
+        if isinstance(expr, Not):
+            return expr.args[0]
+        if isinstance(expr, Constant):
+            return FALSE if expr.value else TRUE
+        return _hash_cons(cls, (expr,))
 
     def evaluate(self, assignment):
         return not self.args[0].evaluate(assignment)
 
 
 class Implies(Formula):
-    def __init__(self, a, b):
-        self.args = [a, b]
+    __slots__ = ("args",)
+
+    def __new__(cls, a, b):
+        if a is FALSE or b is TRUE or a is b:
+            return TRUE
+        if a is TRUE:
+            return b
+        if b is FALSE:
+            return Not(a)
+        return _hash_cons(cls, (a, b))
 
     def evaluate(self, assignment):
         P, Q = self.args
@@ -100,8 +255,18 @@ class Implies(Formula):
 
 
 class Iff(Formula):
-    def __init__(self, a, b):
-        self.args = [a, b]
+    __slots__ = ("args",)
+
+    def __new__(cls, a, b):
+        if a is b:
+            return TRUE
+        if a is _complement(b):
+            return FALSE
+        if isinstance(a, Constant):
+            a, b = b, a
+        if isinstance(b, Constant):
+            return a if b.value else Not(a)
+        return _hash_cons(cls, (a, b))
 
     def evaluate(self, assignment):
         P, Q = self.args
@@ -111,8 +276,18 @@ class Iff(Formula):
 
 
 class Xor(Formula):
-    def __init__(self, a, b):
-        self.args = [a, b]
+    __slots__ = ("args",)
+
+    def __new__(cls, a, b):
+        if a is b:
+            return FALSE
+        if a is _complement(b):
+            return TRUE
+        if isinstance(a, Constant):
+            a, b = b, a
+        if isinstance(b, Constant):
+            return Not(a) if b.value else a
+        return _hash_cons(cls, (a, b))
 
     def evaluate(self, assignment):
         P, Q = self.args
@@ -121,6 +296,10 @@ class Xor(Formula):
         return (a and (not b)) or (b and (not a))
 
 
+TRUE = Constant(True)
+FALSE = Constant(False)
+
+
 def is_atomic(formula):
     if not isinstance(formula, Formula):
         raise ValueError("argument must be a Formula")
@@ -140,8 +319,24 @@ def is_simple_disjunction(formula):
     return True
 
 
+def _cached(formula, key, compute):
+    """
+    compute(formula), computed only once per node (formulas are immutable).
+    """
+    cache = getattr(formula, "_cache", None)
+    if cache is None:
+        cache = formula._cache = {}
+    if key not in cache:
+        cache[key] = compute(formula)
+    return cache[key]
+
+
 def is_cnf(formula):
-    if is_atomic(formula) or is_simple_disjunction(formula):
+    return _cached(formula, "cnf", _is_cnf)
+
+
+def _is_cnf(formula):
+    if is_simple_disjunction(formula) or isinstance(formula, Constant):
         return True
     if not isinstance(formula, And):
         return False
@@ -153,117 +348,232 @@ def is_cnf(formula):
 
 def post_order_depth_first(formula):
     """
-    Iterate over the subformulas of the formula (is a tree) in a way such that
-    every subformula is preceded by it's childs.
+    List the distinct subformulas of the formula (can be a DAG) in a way such
+    that every subformula is preceded by it's childs.
     """
-    q = [formula]
-    i = 0
-    while i != len(q):
-        node = q[i]
-        i += 1
-        if isinstance(node, Symbol):
+    order = []
+    seen = set()
+    stack = [(formula, False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            order.append(node)
+            continue
+        if node in seen:
             continue
-        for other in node.args:
-            q.append(other)
-    q.reverse()
-    return q
+        seen.add(node)
+        stack.append((node, True))
+        if not isinstance(node, Symbol):
+            for x in reversed(node.args):
+                if x not in seen:
+                    stack.append((x, False))
+    return order
+
+
+def _node_shape(node, shapes):
+    depth = 0
+    if shapes:
+        depth = 1 + max(d for d, _ in shapes)
+    if isinstance(node, (And, Or)):
+        nnf = all(x for _, x in shapes)
+    elif isinstance(node, Not):
+        nnf = isinstance(node.args[0], Symbol)
+    else:
+        nnf = isinstance(node, (Symbol, Constant))
+    return depth, nnf
+
+
+def _shape_step(node):
+    if isinstance(node, Symbol):
+        return None, (0, True)
+    shape = getattr(node, "_shape", None)
+    if shape is not None:
+        return None, shape
+
+    def build(*shapes):
+        node._shape = _node_shape(node, shapes)
+        return node._shape
+    return node.args, build
+
+
+def depth(formula):
+    """
+    Length of the longest path from the formula to a Symbol. Like the rest of
+    the structural properties it is computed bottom-up once and kept in the
+    nodes.
+    """
+    return _transform(formula, _shape_step)[0]
+
+
+def size(formula):
+    """
+    Number of distinct subformulas.
+    """
+    return _cached(formula, "size", lambda x: len(post_order_depth_first(x)))
+
+
+def _symbols_in_order(formula):
+    return tuple(x for x in post_order_depth_first(formula)
+                 if isinstance(x, Symbol))
 
 
 def iter_symbols(formula):
-    for sub in post_order_depth_first(formula):
-        if isinstance(sub, Symbol):
-            yield sub
+    return iter(_cached(formula, "symbols", _symbols_in_order))
 
 
 def symbols_of(formula):
-    return set(iter_symbols(formula))
+    return _cached(formula, "symbol set", lambda x: frozenset(iter_symbols(x)))
+
+
+def _transform(formula, step, memo=None):
+    """
+    Apply a transformation to every distinct subformula using an explicit
+    stack, so deep formulas don't hit the recursion limit.
+    `step(node)` returns a pair (deps, build): the node transforms into
+    build(*transformed deps), or into build itself if deps is None.
+    Dependencies are transformed left to right.
+    """
+    if memo is None:
+        memo = {}
+    stack = [formula]
+    waiting = {}
+    while stack:
+        node = stack[-1]
+        if node in memo:
+            stack.pop()
+            continue
+        if node in waiting:
+            deps, build = waiting.pop(node)
+        else:
+            deps, build = step(node)
+            if deps is not None:
+                missing = [x for x in deps if x not in memo]
+                if missing:
+                    waiting[node] = deps, build
+                    missing.reverse()
+                    stack.extend(missing)
+                    continue
+        stack.pop()
+        if deps is None:
+            memo[node] = build
+        else:
+            memo[node] = build(*[memo[x] for x in deps])
+    return memo[formula]
+
+
+def _identity(x):
+    return x
+
+
+def _negate(x):
+    return -x
 
 
 def pformula(formula, var=None):
     if var is None:
         var = {}
-    if formula in var:
-        return var[formula]
-    if isinstance(formula, Symbol):
-        ret = u"p{}".format(len(var))
-        var[formula] = ret
-        return ret
-    if isinstance(formula, Not):
-        return u"¬{}".format(pformula(formula.args[0], var))
-    if isinstance(formula, And):
-        sep = u" and "
-    if isinstance(formula, Or):
-        sep = u" or "
-    if isinstance(formula, Implies):
-        sep = u" => "
-    if isinstance(formula, Iff):
-        sep = u" <=> "
-    if isinstance(formula, Xor):
-        sep = u" ° "
-    return "(" + sep.join(pformula(x, var) for x in formula.args) + ")"
+
+    def step(node):
+        if node in var:
+            return None, var[node]
+        if isinstance(node, Symbol):
+            ret = u"p{}".format(len(var))
+            var[node] = ret
+            return None, ret
+        if isinstance(node, Constant):
+            return None, u"⊤" if node.value else u"⊥"
+        if isinstance(node, Not):
+            return node.args, u"¬{}".format
+        if isinstance(node, And):
+            sep = u" and "
+        if isinstance(node, Or):
+            sep = u" or "
+        if isinstance(node, Implies):
+            sep = u" => "
+        if isinstance(node, Iff):
+            sep = u" <=> "
+        if isinstance(node, Xor):
+            sep = u" ° "
+        return node.args, lambda *xs: "(" + sep.join(xs) + ")"
+
+    return _transform(formula, step)
 
 
 def rformula(formula, var=None):
     if var is None:
         var = {}
-    if formula in var:
-        return var[formula]
-    if isinstance(formula, Symbol):
-        ret = u"p{}".format(len(var))
-        var[formula] = ret
-        return ret
-    if isinstance(formula, Not):
-        return u"¬{}".format(rformula(formula.args[0], var))
-    return formula.__class__.__name__ + \
-           "(" + ", ".join(rformula(x, var) for x in formula.args) + ")"
 
-
-def remove_sugar(formula):
-    """
-    Make an equivalente formula made of And, Or, Not and Symbol.
-    """
-    if isinstance(formula, Symbol):
-        return formula
+    def step(node):
+        if node in var:
+            return None, var[node]
+        if isinstance(node, Symbol):
+            ret = u"p{}".format(len(var))
+            var[node] = ret
+            return None, ret
+        if isinstance(node, Constant):
+            return None, u"TRUE" if node.value else u"FALSE"
+        if isinstance(node, Not):
+            return node.args, u"¬{}".format
+        name = node.__class__.__name__
+        return node.args, lambda *xs: name + "(" + ", ".join(xs) + ")"
+
+    return _transform(formula, step)
+
+
+def _remove_sugar_step(formula):
+    if isinstance(formula, (Symbol, Constant)):
+        return None, formula
     if isinstance(formula, Not):
-        return -remove_sugar(formula.args[0])
+        return formula.args, _negate
     if len(formula.args) == 1:
-        return remove_sugar(formula.args[0])
+        return formula.args, _identity
     if isinstance(formula, And):
-        return And(*[remove_sugar(x) for x in formula.args])
+        return formula.args, And
     if isinstance(formula, Or):
-        return Or(*[remove_sugar(x) for x in formula.args])
+        return formula.args, Or
     if isinstance(formula, Implies):
         P, Q = formula.args
-        return remove_sugar(-P | Q)
+        return (-P | Q,), _identity
     if isinstance(formula, Iff):
         P, Q = formula.args
-        return remove_sugar((-P | Q) & (-Q | P))
+        return ((-P | Q) & (-Q | P),), _identity
     if isinstance(formula, Xor):
         P, Q = formula.args
-        return remove_sugar((-P & Q) | (-Q & P))
+        return ((-P & Q) | (-Q & P),), _identity
     assert False
 
 
-def apply_demorgan(formula):
-    if is_atomic(formula):
-        return formula
+def remove_sugar(formula, memo=None):
+    """
+    Make an equivalente formula made of And, Or, Not and Symbol.
+    """
+    return _transform(formula, _remove_sugar_step, memo)
+
+
+def _apply_demorgan_step(formula):
+    if is_atomic(formula) or isinstance(formula, Constant):
+        return None, formula
     if isinstance(formula, Not):
         sub = formula.args[0]
         if isinstance(sub, Not):
-            return apply_demorgan(sub.args[0])
+            return sub.args, _identity
         if isinstance(sub, And):
-            return apply_demorgan(Or(*[-x for x in sub.args]))
+            return (Or(*[-x for x in sub.args]),), _identity
         if isinstance(sub, Or):
-            return apply_demorgan(And(*[-x for x in sub.args]))
+            return (And(*[-x for x in sub.args]),), _identity
         assert False
     if isinstance(formula, And):
-        return And(*[apply_demorgan(x) for x in formula.args])
+        return formula.args, And
     if isinstance(formula, Or):
-        return Or(*[apply_demorgan(x) for x in formula.args])
+        return formula.args, Or
     raise ValueError("apply_demorgan requieres all instances of {} to be "
              "previously removed using remove_sugar".format(formula.__class__))
 
 
+def apply_demorgan(formula, memo=None):
+    return _transform(formula, _apply_demorgan_step, memo)
+
+
 def to_negative_normal_form(formula):
     formula = remove_sugar(formula)
     formula = apply_demorgan(formula)
@@ -271,12 +581,7 @@ def to_negative_normal_form(formula):
 
 
 def is_negative_normal_form(formula):
-    for x in post_order_depth_first(formula):
-        if not isinstance(x, (And, Or, Not, Symbol)):
-            return False
-        if isinstance(x, Not) and not isinstance(x.args[0], Symbol):
-            return False
-    return True
+    return _transform(formula, _shape_step)[1]
 
 
 def _polynomial_cnf_distribute_or(formula):
@@ -285,6 +590,7 @@ def _polynomial_cnf_distribute_or(formula):
     polynomially larger than the input. As a side effect it introduces dummy
     variables into the formula.
     Input and output are not equivalent but equi-satisfasible.
+    The And arguments of the input must be already distributed.
     """
     assert isinstance(formula, Or)
     ands = []
@@ -292,7 +598,7 @@ def _polynomial_cnf_distribute_or(formula):
     for x in formula.args:
         assert not isinstance(x, Or)
         if isinstance(x, And):
-            ands.append(cnf_distribute_and(x))
+            ands.append(x)
         else:
             rest.append(x)
     if not ands:
@@ -310,6 +616,7 @@ def _exponential_cnf_distribute_or(formula):
     """
     This version of distribute generates (at worse) a formula that is
     exponentially larger than the input. Input and output are equivalent.
+    The And arguments of the input must be already distributed.
     """
     assert isinstance(formula, Or)
     ands = []
@@ -317,35 +624,61 @@ def _exponential_cnf_distribute_or(formula):
     for x in formula.args:
         assert not isinstance(x, Or)
         if isinstance(x, And):
-            ands.append(cnf_distribute_and(x))
+            ands.append(x)
         else:
             rest.append(x)
     if not ands:
         return formula
     ys = []
+    factors = [x.args for x in ands]
     if rest:
-        ands.append(And(Or(*rest)))
-    for xs in itertools.product(*[x.args for x in ands]):
+        factors.append((Or(*rest),))
+    for xs in itertools.product(*factors):
         ys.append(Or(*xs))
     return And(*ys)
 
 
-def cnf_distribute_or(formula):
+def _distribute_or(*args):
+    formula = Or(*args)
+    if not isinstance(formula, Or):  # The distributed args folded it away
+        return formula
     return _exponential_cnf_distribute_or(formula)
 
 
-def cnf_distribute_and(formula):
+def _cnf_distribute_step(formula):
+    if isinstance(formula, And):
+        return formula.args, And
+    if isinstance(formula, Or):
+        return formula.args, _distribute_or
+    return None, formula
+
+
+def cnf_distribute_or(formula, memo=None):
+    assert isinstance(formula, Or)
+    return _transform(formula, _cnf_distribute_step, memo)
+
+
+def cnf_distribute_and(formula, memo=None):
     assert isinstance(formula, And)
-    xs = []
-    for x in formula.args:
-        if isinstance(x, Or):
-            xs.append(cnf_distribute_or(x))
-        else:
-            xs.append(x)
-    return And(*xs)
+    return _transform(formula, _cnf_distribute_step, memo)
+
+
+def to_cnf(formula, encoding=DISTRIBUTE):
+    """
+    With the DISTRIBUTE encoding the result is equivalent to the input, with
+    TSEITIN or PLAISTED_GREENBAUM it is equi-satisfiable and has one extra
+    variable per gate. AND_INVERTER lowers it to an And-Inverter Graph first
+    (see ssaa.aig) and has one extra variable per AND node.
+    """
+    if encoding != DISTRIBUTE:
+        clauses, _, reverse = to_clauses(formula, encoding)
+        return clauses_to_formula(clauses, reverse)
+    if is_cnf(formula):
+        return formula
+    return _cached(formula, "to_cnf", _distribute_cnf)
 
 
-def to_cnf(formula):
+def _distribute_cnf(formula):
     nnf = to_negative_normal_form(formula)
     if is_atomic(nnf):
         return nnf
@@ -354,33 +687,22 @@ def to_cnf(formula):
     elif isinstance(nnf, Or):
         return cnf_distribute_or(nnf)
     else:
-        return formula
+        return nnf
 
 
-def upgrade_cnf_formula(formula):
+def iter_clauses(formula):
     if not is_cnf(formula):
         raise ValueError("Expecting a formula in cnf")
-    if is_atomic(formula):
-        return And(Or(formula))
-    elif is_simple_disjunction(formula):
-        return And(formula)
-    return formula
+    clauses = formula.args if isinstance(formula, And) else (formula,)
+    for clause in clauses:
+        yield clause.args if isinstance(clause, Or) else (clause,)
 
 
-def upgrade_simple_disjunction(formula):
-    if is_atomic(formula):
-        return Or(formula)
-    return formula
-
-
-def iter_clauses(formula):
-    formula = upgrade_cnf_formula(formula)
-    for clause in formula.args:
-        clause = upgrade_simple_disjunction(clause)
-        yield clause.args
+def is_horn(formula):
+    return _cached(formula, "horn", _is_horn)
 
 
-def is_horn(formula):
+def _is_horn(formula):
     for clause in iter_clauses(formula):
         positive = sum(1 for literal in clause if isinstance(literal, Symbol))
         if positive > 1:
@@ -388,13 +710,40 @@ def is_horn(formula):
     return True
 
 
-def to_clauses(formula):  # TODO: Test
-    if not is_cnf(formula):
-        raise ValueError("Formula has to be in CNF")
+def to_clauses(formula, encoding=DISTRIBUTE):  # TODO: Test
+    """
+    Clauses as lists of integers, plus the mappings from Symbols to integers
+    (names) and back (reverse).
+    """
     names = {}
     reverse = [None]
-    clauses = []
-    for atoms in iter_clauses(formula.to_cnf()):
+    clauses = list(iter_int_clauses(formula, names, reverse, encoding))
+    return clauses, names, reverse
+
+
+def iter_int_clauses(formula, names, reverse, encoding=DISTRIBUTE):
+    """
+    Yield the clauses of to_clauses one at a time, adding new variables to
+    `names` and `reverse` (initially {} and [None]) as they show up.
+    """
+    if encoding not in (DISTRIBUTE, TSEITIN, PLAISTED_GREENBAUM,
+                        AND_INVERTER):
+        raise ValueError("Unknown CNF encoding {!r}".format(encoding))
+    if isinstance(formula, Constant):
+        return iter([] if formula.value else [[]])
+    if encoding == AND_INVERTER:
+        from ssaa.aig import iter_aig_clauses  # aig imports this module
+        return iter_aig_clauses(formula, names, reverse)
+    if encoding != DISTRIBUTE:
+        return _iter_tseitin_clauses(formula, names, reverse,
+                                     encoding == PLAISTED_GREENBAUM)
+    if not is_cnf(formula):
+        raise ValueError("Formula has to be in CNF")
+    return _iter_cnf_clauses(formula, names, reverse)
+
+
+def _iter_cnf_clauses(formula, names, reverse):
+    for atoms in iter_clauses(formula):
         clause = []
         for atom in atoms:
             polarity = 1
@@ -408,5 +757,259 @@ def to_clauses(formula):  # TODO: Test
             else:
                 name = names[atom]
             clause.append(polarity * name)
-        clauses.append(clause)
+        yield clause
+
+
+def clauses_to_formula(clauses, reverse):
+    xs = []
+    for clause in clauses:
+        atoms = []
+        for lit in clause:
+            atom = reverse[abs(lit)]
+            if lit < 0:
+                atom = -atom
+            atoms.append(atom)
+        xs.append(Or(*atoms) if atoms else FALSE)
+    if not xs:
+        return TRUE
+    return And(*xs)
+
+
+def topological_order(formula):
+    """
+    List the distinct subformulas of the formula (can be a DAG) in a way such
+    that every subformula is preceded by all the subformulas that contain it.
+    """
+    order = post_order_depth_first(formula)
+    order.reverse()
+    return order
+
+
+_FLIP = {POSITIVE: NEGATIVE, NEGATIVE: POSITIVE, BOTH: BOTH}
+
+
+def polarities(order):
+    """
+    Map every subformula to the polarities (POSITIVE, NEGATIVE or BOTH) it
+    occurs with, `order` as given by topological_order.
+    """
+    polarity = {order[0]: POSITIVE}
+    for node in order:
+        if isinstance(node, Symbol):
+            continue
+        p = polarity[node]
+        if isinstance(node, Not):
+            ps = [_FLIP[p]]
+        elif isinstance(node, (And, Or)):
+            ps = [p] * len(node.args)
+        elif isinstance(node, Implies):
+            ps = [_FLIP[p], p]
+        else:
+            ps = [BOTH, BOTH]
+        for x, q in zip(node.args, ps):
+            polarity[x] = polarity.get(x, 0) | q
+    return polarity
+
+
+def _gate_clauses(gate, formula, args, polarity):
+    """
+    Clauses for `gate <=> formula` (only the directions in `polarity`), where
+    `args` are the literals of formula's arguments.
+    """
+    clauses = []
+    if isinstance(formula, Implies):
+        args = [-args[0], args[1]]
+    if isinstance(formula, And):
+        if polarity & POSITIVE:
+            clauses.extend([-gate, x] for x in args)
+        if polarity & NEGATIVE:
+            clauses.append([gate] + [-x for x in args])
+    elif isinstance(formula, (Or, Implies)):
+        if polarity & POSITIVE:
+            clauses.append([-gate] + args)
+        if polarity & NEGATIVE:
+            clauses.extend([gate, -x] for x in args)
+    else:
+        a, b = args
+        if isinstance(formula, Xor):  # a xor b <=> (a <=> -b)
+            b = -b
+        if polarity & POSITIVE:
+            clauses.append([-gate, -a, b])
+            clauses.append([-gate, a, -b])
+        if polarity & NEGATIVE:
+            clauses.append([gate, a, b])
+            clauses.append([gate, -a, -b])
+    return clauses
+
+
+def tseitin_clauses(formula, polarity_aware=False):
+    """
+    Tseitin encoding: one new variable per gate (Not is a negated literal) and
+    clauses that are linear in the size of the formula.
+    If polarity_aware is True only the implications needed by the polarity
+    of each gate are emitted (Plaisted-Greenbaum).
+    Returns the same as to_clauses, the new variables are new Symbols.
+    """
+    names = {}
+    reverse = [None]
+    clauses = list(_iter_tseitin_clauses(formula, names, reverse,
+                                         polarity_aware))
     return clauses, names, reverse
+
+
+def _iter_tseitin_clauses(formula, names, reverse, polarity_aware):
+    order = topological_order(formula)
+    polarity = None
+    if polarity_aware:
+        polarity = polarities(order)
+    lits = {}
+    for node in reversed(order):
+        if node in names:  # Named by earlier clauses
+            lits[node] = names[node]
+            continue
+        if isinstance(node, Symbol):
+            atom = node
+        elif isinstance(node, Not):
+            lits[node] = -lits[node.args[0]]
+            continue
+        elif len(node.args) == 1:
+            lits[node] = lits[node.args[0]]
+            continue
+        else:
+            atom = Symbol()
+        name = len(reverse)
+        names[atom] = name
+        reverse.append(atom)
+        lits[node] = name
+        if atom is not node:
+            args = [lits[x] for x in node.args]
+            p = BOTH if polarity is None else polarity[node]
+            for clause in _gate_clauses(name, node, args, p):
+                yield clause
+    yield [lits[formula]]
+
+
+_COMPILED_OPERATORS = {
+    And: " and ".join,
+    Or: " or ".join,
+    Not: lambda xs: "not " + xs[0],
+    Implies: lambda xs: "not {} or {}".format(*xs),
+    Iff: lambda xs: "{} is {}".format(*xs),
+    Xor: lambda xs: "{} is not {}".format(*xs),
+}
+
+
+def compile_formula(formula):
+    """
+    Compile the formula into a straight-line Python function that takes an
+    assignment and returns the same as formula.evaluate(assignment), but
+    without recursion and evaluating each distinct subformula only once.
+    """
+    order = post_order_depth_first(formula)
+    variables = {}
+    symbols = []
+    lookups = []
+    gates = []
+    for node in order:
+        var = "x{}".format(len(variables))
+        variables[node] = var
+        if isinstance(node, Symbol):
+            lookups.append("        {} = a[s[{}]]".format(var, len(symbols)))
+            symbols.append(node)
+        elif isinstance(node, Constant):
+            gates.append("    {} = {}".format(var, node.value))
+        else:
+            args = [variables[x] for x in node.args]
+            expr = _COMPILED_OPERATORS[node.__class__](args)
+            gates.append("    {} = {}".format(var, expr))
+    lines = ["def evaluate(a):",
+             "    try:"]
+    lines.extend(lookups or ["        pass"])
+    lines.extend(["    except KeyError:",
+                  "        missing(a)"])
+    lines.extend(gates)
+    lines.append("    return {}".format(variables[formula]))
+
+    def missing(assignment):
+        for symbol in symbols:
+            if symbol not in assignment:
+                raise UnassignedSymbol(symbol)
+        raise
+    namespace = {"s": tuple(symbols), "missing": missing}
+    exec(compile("\n".join(lines), "<formula>", "exec"), namespace)
+    return namespace["evaluate"]
+
+
+def _reduce(operator):
+    return lambda xs: reduce(operator, xs)
+
+
+if numpy is not None:
+    _PACKED_OPERATORS = {
+        And: _reduce(numpy.bitwise_and),
+        Or: _reduce(numpy.bitwise_or),
+        Not: lambda xs: ~xs[0],
+        Implies: lambda xs: ~xs[0] | xs[1],
+        Iff: lambda xs: ~(xs[0] ^ xs[1]),
+        Xor: lambda xs: xs[0] ^ xs[1],
+    }
+
+
+_ONES = 0xFFFFFFFFFFFFFFFF
+
+
+def evaluate_packed(formula, packed):
+    """
+    Evaluate the formula over many assignments at once. `packed` maps every
+    Symbol to a numpy.uint64 array where bit i of word j is the value of the
+    symbol in assignment 64 * j + i. Returns the results packed the same way.
+    """
+    values = {}
+    for node in post_order_depth_first(formula):
+        if isinstance(node, Symbol):
+            if node not in packed:
+                raise UnassignedSymbol(node)
+            values[node] = packed[node]
+        elif isinstance(node, Constant):
+            words = max([len(x) for x in packed.values()] or [1])
+            values[node] = numpy.full(words, node.value * _ONES,
+                                      dtype=numpy.uint64)
+        else:
+            args = [values[x] for x in node.args]
+            values[node] = _PACKED_OPERATORS[node.__class__](args)
+    return values[formula]
+
+
+def pack_assignments(assignments, symbols):
+    """
+    Pack a list of assignments into the format used by evaluate_packed.
+    """
+    words = (len(assignments) + 63) // 64
+    shifts = numpy.arange(64, dtype=numpy.uint64)
+    packed = {}
+    for symbol in symbols:
+        bits = numpy.zeros(words * 64, dtype=numpy.uint64)
+        try:
+            bits[:len(assignments)] = [a[symbol] for a in assignments]
+        except KeyError:
+            raise UnassignedSymbol(symbol)
+        bits <<= numpy.tile(shifts, words)
+        packed[symbol] = numpy.bitwise_or.reduce(bits.reshape(words, 64),
+                                                 axis=1)
+    return packed
+
+
+def unpack_values(packed, n):
+    shifts = numpy.arange(64, dtype=numpy.uint64)
+    bits = (packed[:, numpy.newaxis] >> shifts) & numpy.uint64(1)
+    return [bool(x) for x in bits.ravel()[:n]]
+
+
+def batch_evaluate(formula, assignments):
+    """
+    Same as [formula.evaluate(a) for a in assignments], 64 at a time.
+    """
+    if not assignments:
+        return []
+    packed = pack_assignments(assignments, symbols_of(formula))
+    return unpack_values(evaluate_packed(formula, packed), len(assignments))
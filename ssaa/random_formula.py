@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
+import itertools
 import random
 from ssaa.propositional_logic import Symbol, And, Or, Not, Implies, Iff, Xor, \
-                                     iter_symbols
+                                     iter_symbols, numpy
 
 
 def random_formula(depth=6):
@@ -22,3 +23,36 @@ def random_assignment(formula):
     for symbol in iter_symbols(formula):
         assignment[symbol] = random.random() < 0.5
     return assignment
+
+
+def random_packed_assignment(formula, words=16):
+    """
+    64 * words random assignments packed as evaluate_packed expects.
+    """
+    assignment = {}
+    for symbol in iter_symbols(formula):
+        bits = [random.getrandbits(64) for _ in xrange(words)]
+        assignment[symbol] = numpy.array(bits, dtype=numpy.uint64)
+    return assignment
+
+
+def pigeonhole(n):
+    """
+    n pigeons in n - 1 holes, unsatisfiable and hard for resolution.
+    """
+    holes = [[Symbol() for _ in xrange(n - 1)] for _ in xrange(n)]
+    constraints = [Or(*row) for row in holes]
+    for j in xrange(n - 1):
+        for a, b in itertools.combinations(xrange(n), 2):
+            constraints.append(-(holes[a][j] & holes[b][j]))
+    return And(*constraints)
+
+
+def random_clauses(n, m, k=3):
+    """
+    m random clauses on the variables 1..n with k literals each, or with a
+    random number of them between low and high if k is a pair (low, high).
+    """
+    low, high = k if isinstance(k, tuple) else (k, k)
+    return [[random.choice([-1, 1]) * random.randint(1, n)
+             for _ in xrange(random.randint(low, high))] for _ in xrange(m)]
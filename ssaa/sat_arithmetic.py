@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-from ssaa.propositional_logic import Symbol, Xor, Iff, And, UnassignedSymbol
+from ssaa.propositional_logic import Symbol, Xor, Iff, And, UnassignedSymbol, \
+                                     Constant, TRUE, FALSE
 
 
 class ArithmeticExpression(object):
@@ -7,6 +8,26 @@ class ArithmeticExpression(object):
     _formula = None
 
     def get_propositional_formula(self):
+        formulas = [expr._get_formula() for expr in self._iter_exprs()]
+        formulas = [formula for formula in formulas if formula is not None]
+        return And(*formulas)
+
+    def get_symbols(self):
+        """
+        The Symbols in the bits of this expression and the ones it is made
+        of, including those that constant folding took out of the formula
+        (pass them to solve or Claused to have them in the models).
+        """
+        symbols = set()
+        for expr in self._iter_exprs():
+            if isinstance(expr, IntegerExpression):
+                bits = expr.bits
+            else:
+                bits = [expr.bit]
+            symbols.update(x for x in bits if isinstance(x, Symbol))
+        return symbols
+
+    def _iter_exprs(self):
         exprs = set()
         queue = [self]
         while queue:
@@ -15,10 +36,7 @@ class ArithmeticExpression(object):
                 exprs.add(current)
                 for child in current.childs:
                     queue.append(child)
-        exprs = list(exprs)
-        formulas = [expr._get_formula() for expr in exprs]
-        formulas = [formula for formula in formulas if formula is not None]
-        return And(*formulas)
+        return exprs
 
     def _get_formula(self):
         return self._formula
@@ -63,6 +81,14 @@ class BooleanExpression(ArithmeticExpression):
             self._formula &= formula
 
 
+class Boolean(BooleanExpression):
+    def __init__(self, bit=None):
+        self.childs = []
+        if bit is None:
+            bit = Symbol()
+        self.bit = bit
+
+
 class Integer(IntegerExpression):
     def __init__(self, bits):
         self.childs = []
@@ -160,10 +186,7 @@ class Integer(IntegerExpression):
         if not isinstance(x, (int, IntegerExpression)):
             raise TypeError("Cannot operate with {}".format(x))
         if isinstance(x, int):
-            x = x % (2 ** len(self.bits))
-            y = Integer(len(self.bits))
-            y.make_constant(x)
-            x = y
+            x = constant_integer(x % (2 ** len(self.bits)), len(self.bits))
         return x
 
 
@@ -299,17 +322,28 @@ class GreaterOrEqualThan(BooleanExpression):
         self._formula = Iff(self.bit, -lt.bit)
 
 
+def constant_integer(value, bits):
+    """
+    An Integer whose bits are the constants TRUE and FALSE instead of
+    Symbols, so the formulas that use it get simplified as they are built.
+    """
+    return Integer([TRUE if value & (1 << i) else FALSE for i in xrange(bits)])
+
+
 def bit_sum(a, b, result, c=None):
-    if not isinstance(a, Symbol) or not isinstance(b, Symbol) or \
-            (result is not None and not isinstance(result, Symbol)) or \
-            (c is not None and not isinstance(c, Symbol)):
+    bit = (Symbol, Constant)
+    if not isinstance(a, bit) or not isinstance(b, bit) or \
+            (result is not None and not isinstance(result, bit)) or \
+            (c is not None and not isinstance(c, bit)):
         raise ValueError("Arguments to bit_sum are expected to be Symbols")
     carry = Symbol()
     if c is None:
         formula = Iff(result, Xor(a, b)) & Iff(carry, a & b)
     else:
-        formula = Iff(result, Xor(a, Xor(b, c))) & \
-                  Iff(carry, (a & c) | (b & c) | (a & b))
+        # The carry reuses a xor b, which is then shared with the result
+        half = Xor(a, b)
+        formula = Iff(result, Xor(half, c)) & \
+                  Iff(carry, (a & b) | (c & half))
     return formula, carry
 
 
@@ -369,10 +403,8 @@ def integer_mul(a=None, b=None, c=None, bits=None, zero_carry=False):
 
 
 def _mul_upgrade(bits, shift):
-    zero = Integer(len(bits))
-    zero.make_constant(0)
+    zero = constant_integer(0, len(bits))
     upgraded = Integer(bits + zero.bits)
-    upgraded.childs.append(zero)
     upgraded = Shift(upgraded, shift)
     assert len(upgraded.bits) == 2 * len(bits)
     return upgraded
@@ -1,24 +1,95 @@
 # -*- coding: utf-8 -*-
 import itertools
-
-import pycosat
-from propositional_logic import iter_symbols, to_clauses
-
-
-def is_theorem(formula, assignment=None):
-    return solve(-formula, assignment=assignment) is None
+import multiprocessing
+import os
+import random
+import StringIO
+import subprocess
+import threading
+import time
+
+try:
+    import pycosat
+except ImportError:  # pycosat_solve falls back to the built-in CDCL solver
+    pycosat = None
+from cdcl import cdcl_solve, CDCLSolver, UNKNOWN
+from dimacs import write_dimacs, read_solution, BATCH_SIZE
+from preprocess import Preprocessor
+from stats import NO_STATS
+from propositional_logic import iter_symbols, to_clauses, DISTRIBUTE, \
+                               evaluate_packed, numpy, iter_int_clauses, size
+
+
+def is_theorem(formula, assignment=None, encoding=DISTRIBUTE,
+               propagation_limit=None, conflict_limit=None, deadline=None,
+               cache=None):
+    """
+    UNKNOWN if the limits (see solve) ran out first.
+    """
+    result = solve(-formula, assignment=assignment, encoding=encoding,
+                   propagation_limit=propagation_limit,
+                   conflict_limit=conflict_limit, deadline=deadline,
+                   cache=cache)
+    if result is UNKNOWN:
+        return UNKNOWN
+    return result is None
+
+
+# Bit i of _PATTERNS[j] is bit j of i: the values of the 6 lowest free
+# symbols over the 64 assignments packed in one word.
+_PATTERNS = [0xAAAAAAAAAAAAAAAA, 0xCCCCCCCCCCCCCCCC, 0xF0F0F0F0F0F0F0F0,
+             0xFF00FF00FF00FF00, 0xFFFF0000FFFF0000, 0xFFFFFFFF00000000]
+_ONES = 0xFFFFFFFFFFFFFFFF
+
+
+def bit_parallel_sat_solver(formula, prev=None, words=1024):
+    """
+    Same as stupid_sat_solver but evaluates 64 * words assignments at a time
+    with evaluate_packed. Needs numpy.
+    """
+    if prev is None:
+        prev = {}
+    free = list(set(iter_symbols(formula)) - set(prev))
+    total = 2 ** len(free)
+    words = min(words, (total + 63) // 64)
+    packed = {}
+    for symbol, value in prev.iteritems():
+        packed[symbol] = numpy.full(words, _ONES if value else 0,
+                                    dtype=numpy.uint64)
+    for j, symbol in enumerate(free[:6]):
+        packed[symbol] = numpy.full(words, _PATTERNS[j], dtype=numpy.uint64)
+    valid = numpy.uint64(_ONES if total >= 64 else 2 ** total - 1)
+    for start in xrange(0, (total + 63) // 64, words):
+        indexes = numpy.arange(start, start + words, dtype=numpy.uint64)
+        for j, symbol in enumerate(free[6:]):
+            bits = (indexes >> numpy.uint64(j)) & numpy.uint64(1)
+            packed[symbol] = bits * numpy.uint64(_ONES)
+        result = evaluate_packed(formula, packed) & valid
+        nonzero = numpy.flatnonzero(result)
+        if len(nonzero):
+            word = int(nonzero[0])
+            bits = int(result[word])
+            i = (start + word) * 64 + (bits & -bits).bit_length() - 1
+            assignment = dict(prev)
+            for j, symbol in enumerate(free):
+                assignment[symbol] = bool((i >> j) & 1)
+            return assignment
+    return None
 
 
 def stupid_sat_solver(formula, prev=None):
     if prev is None:
         prev = {}
+    if numpy is not None:
+        return bit_parallel_sat_solver(formula, prev)
     literals = set(iter_symbols(formula))
     free = list(literals - set(prev))
     assignment = {}
     assignment.update(prev)
+    evaluate = formula.compile()
     for bools in itertools.product((True, False), repeat=len(free)):
         assignment.update(zip(free, bools))
-        if formula.evaluate(assignment):
+        if evaluate(assignment):
             return assignment
     return None
 
@@ -70,55 +141,655 @@ def reduce_clauses_with_assignment(clauses, assignments):  # TODO: Test
     return newclauses
 
 
-def _assignment_step(clauses):
-    result = set()
-    result.update(iter_unit_literals(clauses))
-    result.update(iter_pure_literals(clauses))
-    return result
-
+class ClauseDatabase(object):
+    """
+    Clauses with two watched literals each, plus the trail of assigned
+    literals. Unit propagation only visits the clauses watching a literal
+    that just became false, and nothing is rebuilt along the way.
+    Add all the clauses before propagating.
+    """
+    def __init__(self, clauses=()):
+        self.clauses = []
+        self.watches = {}
+        self.assigned = set()  # True literals
+        self.trail = []
+        self.head = 0  # Trail position up to which propagation is done
+        self.ok = True  # False once a clause was found to be false
+        for clause in clauses:
+            self.add(clause)
+
+    def add(self, clause):
+        lits = []
+        for lit in clause:
+            if -lit in lits:  # Tautology (p or -p)
+                return
+            if lit not in lits:  # Idempotent elimination
+                lits.append(lit)
+        if not lits:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0])
+        else:
+            self.clauses.append(lits)
+            index = len(self.clauses) - 1
+            for lit in lits[:2]:
+                self.watches.setdefault(lit, []).append(index)
+
+    def assign(self, lit):
+        if lit in self.assigned:
+            return
+        if -lit in self.assigned:
+            self.ok = False
+            return
+        self.assigned.add(lit)
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Unit propagation up to a fixpoint. Returns the false clause if there
+        is a conflict, None otherwise.
+        """
+        assigned = self.assigned
+        trail = self.trail
+        clauses = self.clauses
+        watches = self.watches
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches.get(false)
+            if not watching:
+                continue
+            keep = []
+            for i, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                other = clause[0]
+                if other in assigned:
+                    keep.append(index)
+                    continue
+                for k in xrange(2, len(clause)):
+                    lit = clause[k]
+                    if -lit not in assigned:
+                        clause[1] = lit
+                        clause[k] = false
+                        watches.setdefault(lit, []).append(index)
+                        break
+                else:
+                    keep.append(index)
+                    if -other in assigned:
+                        keep.extend(watching[i + 1:])
+                        watches[false] = keep
+                        self.ok = False
+                        return clause
+                    assigned.add(other)
+                    trail.append(other)
+            watches[false] = keep
+        return None
 
-def simplify_clauses(clauses):
+    def assign_pure_literals(self):
+        """
+        Assign the literals whose negation doesn't show up in any clause that
+        is not satisfied yet, until there are none.
+        """
+        assigned = self.assigned
+        occurrences = {}
+        open_clauses = []
+        for index, clause in enumerate(self.clauses):
+            if any(lit in assigned for lit in clause):
+                continue
+            open_clauses.append(index)
+            for lit in clause:
+                if -lit not in assigned:
+                    occurrences.setdefault(lit, []).append(index)
+        counts = dict((lit, len(xs)) for lit, xs in occurrences.iteritems())
+        satisfied = set()
+        pure = [lit for lit in occurrences if -lit not in occurrences]
+        while pure:
+            lit = pure.pop()
+            if lit in assigned or not counts[lit] or counts.get(-lit):
+                continue
+            self.assign(lit)
+            for index in occurrences[lit]:
+                if index in satisfied:
+                    continue
+                satisfied.add(index)
+                for other in self.clauses[index]:
+                    if other in counts and other != lit:
+                        counts[other] -= 1
+                        if not counts[other] and counts.get(-other):
+                            pure.append(-other)
+        self.head = len(self.trail)  # Nothing to propagate from them
+
+    def remaining(self):
+        """
+        The clauses that are not satisfied, without their false literals.
+        """
+        assigned = self.assigned
+        result = []
+        for clause in self.clauses:
+            if not any(lit in assigned for lit in clause):
+                result.append([lit for lit in clause if -lit not in assigned])
+        return result
+
+
+def simplify_clauses(clauses, pure_literals=True):
+    """
+    Unit propagation and pure literal elimination until neither applies
+    (only unit propagation without pure_literals, which keeps every model).
+    Returns the clauses left (with their false literals removed, [[]] if
+    there is a conflict), the set of assigned literals and the set of
+    variables that disappeared without getting a value.
+    """
     original_vars = set(iter_vars(clauses))
-    global_assignments = set()
-    clauses = reduce_clauses_with_assignment(clauses, global_assignments)
-    step_assignments = _assignment_step(clauses)
-    while step_assignments:
-        for lit in step_assignments:
-            if -lit not in global_assignments:
-                global_assignments.add(lit)
-        clauses = reduce_clauses_with_assignment(clauses, global_assignments)
-        if clauses is None:
-            clauses = [[]]
-            break
-        step_assignments = _assignment_step(clauses)
-    assigned = set(abs(lit) for lit in global_assignments)
+    database = ClauseDatabase(clauses)
+    if database.ok and database.propagate() is None:
+        if pure_literals:
+            database.assign_pure_literals()
+        clauses = database.remaining()
+    else:
+        clauses = [[]]
+    assigned = set(abs(lit) for lit in database.assigned)
     unassigned = set(iter_vars(clauses))
     free = (original_vars - assigned) - unassigned
-    return clauses, global_assignments, free
+    return clauses, set(database.assigned), free
+
+
+def to_dimacs(clauses):
+    """
+    The whole DIMACS file as a string, see dimacs.write_dimacs to stream it.
+    """
+    fout = StringIO.StringIO()
+    write_dimacs(fout, clauses)
+    return fout.getvalue()
+
+
+class ClauseSink(object):
+    """
+    Receives clauses one at a time from stream_clauses.
+    """
+    def add(self, clause):
+        raise NotImplementedError()
+
+    def close(self, variables):
+        pass
+
+
+class ClauseList(ClauseSink):
+    def __init__(self):
+        self.clauses = []
+
+    def add(self, clause):
+        self.clauses.append(clause)
+
+
+class ClauseCounter(ClauseSink):
+    clauses = 0
+    literals = 0
+    variables = 0
+
+    def add(self, clause):
+        self.clauses += 1
+        self.literals += len(clause)
+
+    def close(self, variables):
+        self.variables = variables
+
+
+class DimacsWriter(ClauseSink):
+    """
+    Writes the clauses in DIMACS format as they arrive. The counts in the
+    header are unknown until close, so `fout` has to be seekable.
+    """
+    header = "p cnf {:<20} {:<20}\n"
+
+    def __init__(self, fout):
+        self.fout = fout
+        self.clauses = 0
+        fout.write("c ssaa\n")
+        self.header_position = fout.tell()
+        fout.write(self.header.format(0, 0))
+
+        self.lines = []
+
+    def add(self, clause):
+        self.clauses += 1
+        self.lines.append(" ".join(map(str, clause)) + " 0\n")
+        if len(self.lines) == BATCH_SIZE:
+            self.fout.write("".join(self.lines))
+            self.lines = []
+
+    def close(self, variables):
+        self.fout.write("".join(self.lines))
+        self.lines = []
+        self.fout.seek(self.header_position)
+        self.fout.write(self.header.format(variables, self.clauses))
+        self.fout.seek(0, 2)
+
+
+def stream_clauses(formula, sink, encoding=DISTRIBUTE):
+    """
+    Send the clauses of the formula to `sink` one at a time, so they are
+    never all in memory at once (with TSEITIN or PLAISTED_GREENBAUM, the
+    DISTRIBUTE encoding builds the whole CNF formula first).
+    Returns names and reverse as to_clauses.
+    """
+    if encoding == DISTRIBUTE:
+        formula = formula.to_cnf()
+    names = {}
+    reverse = [None]
+    for clause in iter_int_clauses(formula, names, reverse, encoding):
+        sink.add(clause)
+    sink.close(len(reverse) - 1)
+    return names, reverse
+
+
+def from_dimacs(fin):
+    """
+    The literals of the "v" lines of a solver's output, see
+    dimacs.read_solution.
+    """
+    for line in fin:
+        if line.startswith("v"):
+            for lit in map(int, line[1:].split()):
+                if lit:
+                    yield lit
+
+
+PYCOSAT_SLICE = 100000  # Propagations of the first run under a deadline
+
+
+def pycosat_solve(clauses, log=False, propagation_limit=None,
+                  conflict_limit=None, deadline=None):
+    """
+    A model as a list of literals, None if the clauses are unsatisfiable
+    and UNKNOWN if a limit ran out first. `deadline` is a time.time() value.
+    pycosat has no conflict limit, with one the built-in CDCL solver is
+    used instead. Under a deadline pycosat runs on slices of propagations
+    (each one starting over), sized from the propagation rate of the last
+    slice to end by the deadline. It gives up as soon as the next slice
+    would be no larger than one that already ran out.
+    """
+    if propagation_limit is not None and propagation_limit <= 0:
+        return UNKNOWN  # For pycosat 0 is no limit
+    if pycosat is None or conflict_limit is not None:
+        return cdcl_solve(clauses, conflict_limit=conflict_limit,
+                          propagation_limit=propagation_limit,
+                          deadline=deadline)
+    if deadline is None:
+        model = pycosat.solve(clauses, verbose=log,
+                              prop_limit=propagation_limit or 0)
+        return _pycosat_result(model)
+    spent = 0
+    failed = 0
+    limit = PYCOSAT_SLICE
+    while True:
+        if time.time() >= deadline:
+            return UNKNOWN
+        if propagation_limit is not None:
+            limit = min(limit, propagation_limit - spent)
+        if limit <= failed:  # Starting over it can't get any further
+            return UNKNOWN
+        start = time.time()
+        model = pycosat.solve(clauses, verbose=log, prop_limit=limit)
+        if model != "UNKNOWN":
+            return _pycosat_result(model)
+        spent += limit
+        failed = limit
+        rate = limit / max(time.time() - start, 1e-3)
+        limit = max(1, min(2 * limit, int(rate * (deadline - time.time()))))
+
+
+def _pycosat_result(model):
+    if model == "UNSAT":
+        return None
+    if model == "UNKNOWN":
+        return UNKNOWN
+    return model
 
 
-def to_dimacs(clauses):  # TODO: Test
-    maxnames = max(abs(lit) for clause in clauses for lit in clause)
-    xs = ["c ssaa", "p cnf {} {}".format(maxnames, len(clauses))]
-    for clause in clauses:
-        line = " ".join(str(i) for i in clause) + " 0"
-        xs.append(line)
-    return "\n".join(xs)
+class SolverTimeout(Exception):
+    pass
+
+
+class ExternalSolver(object):
+    """
+    A `solver=` that runs a solver binary speaking DIMACS, command being
+    its argument list (for instance ["kissat", "-q"]). The clauses are
+    streamed into its stdin and the answer is read from its stdout in the
+    SAT competition format.
+    The process is killed after `timeout` seconds (raising SolverTimeout),
+    when cancel is called from another thread, or when the call is
+    interrupted in any other way.
+    Of the limits of solve only the deadline applies, and UNKNOWN is
+    returned if it kills the process.
+    """
+    def __init__(self, command, timeout=None):
+        self.command = list(command)
+        self.timeout = timeout
+        self.process = None
+        self.killed = False
+
+    def __call__(self, clauses, propagation_limit=None, conflict_limit=None,
+                 deadline=None):
+        timeout = self.timeout
+        if deadline is not None:
+            remaining = max(deadline - time.time(), 0)
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+            else:
+                deadline = None  # The timeout comes first
+        devnull = open(os.devnull, "wb")
+        self.killed = False
+        try:
+            self.process = subprocess.Popen(self.command,
+                                            stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE,
+                                            stderr=devnull)
+        finally:
+            devnull.close()
+        process = self.process
+        feeder = threading.Thread(target=self._feed,
+                                  args=(process.stdin, clauses))
+        feeder.daemon = True
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, self.cancel)
+            timer.start()
+        try:
+            feeder.start()
+            result, model = read_solution(process.stdout)
+            feeder.join()
+            process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if process.poll() is None:  # Interrupted
+                _kill(process)
+                process.wait()
+            process.stdout.close()
+            self.process = None
+        if result:
+            return model
+        if result is False:
+            return None
+        if self.killed and deadline is not None:
+            return UNKNOWN
+        if self.killed:
+            raise SolverTimeout(self.command)
+        raise RuntimeError("{} gave no answer (exit code {})".format(
+                           self.command[0], process.returncode))
+
+    @staticmethod
+    def _feed(fin, clauses):
+        try:
+            write_dimacs(fin, clauses)
+            fin.close()
+        except IOError:  # The solver exited (or was killed) before reading
+            pass
+
+    def cancel(self):
+        """
+        Kill the running process, if any.
+        """
+        process = self.process
+        if process is not None and process.poll() is None:
+            self.killed = True
+            _kill(process)
+
+
+def _kill(process):
+    try:
+        process.kill()
+    except OSError:  # It exited in between
+        pass
+
+
+PYCOSAT = "pycosat"
+CDCL = "cdcl"
+
+
+def portfolio_configurations(n):
+    """
+    n diversified (backend, seed) pairs: the backends alternate and every
+    seed after the first of each backend shuffles the problem differently.
+    """
+    backends = [PYCOSAT, CDCL] if pycosat is not None else [CDCL]
+    return [(backends[i % len(backends)], i // len(backends))
+            for i in xrange(n)]
+
+
+def run_configuration(clauses, configuration, limits=None):
+    """
+    Solve the clauses with one (backend, seed) portfolio configuration.
+    A nonzero seed renames the variables (flipping some of them) and
+    shuffles the clauses and their literals, the model is mapped back.
+    The limits are keyword arguments for the backend (see solve).
+    """
+    if limits is None:
+        limits = {}
+    backend, seed = configuration
+    if seed:
+        rng = random.Random(seed)
+        variables = max([abs(lit) for clause in clauses for lit in clause]
+                        or [0])
+        rename = range(1, variables + 1)
+        rng.shuffle(rename)
+        rename = [0] + [x if rng.random() < 0.5 else -x for x in rename]
+        shuffled = []
+        for clause in clauses:
+            clause = [rename[lit] if lit > 0 else -rename[-lit]
+                      for lit in clause]
+            rng.shuffle(clause)
+            shuffled.append(clause)
+        rng.shuffle(shuffled)
+    else:
+        shuffled = clauses
+    if backend == PYCOSAT:
+        model = pycosat_solve(shuffled, **limits)
+    else:
+        model = cdcl_solve(shuffled, seed=seed or None, **limits)
+    if model is None or model is UNKNOWN or not seed:
+        return model
+    values = dict((abs(lit), lit > 0) for lit in model)
+    result = []
+    for var in xrange(1, variables + 1):
+        renamed = rename[var]
+        value = values.get(abs(renamed), False) is (renamed > 0)
+        result.append(var if value else -var)
+    return result
 
 
-def from_dimacs(fin):  # TODO: Test
-    for line in fin:
-        line = line.split()
-        if len(line) == 2 and line[0] == "v":
-            lit = int(line[1])
-            yield lit
+_worker_clauses = None
+_worker_solver = None
+_worker_limits = None
+
+
+def _init_worker(clauses, limits, solver=None):
+    global _worker_clauses, _worker_limits, _worker_solver
+    _worker_clauses = clauses
+    _worker_limits = limits
+    _worker_solver = solver
+
+
+def _run_worker(configuration):
+    return configuration, run_configuration(_worker_clauses, configuration,
+                                            _worker_limits)
+
+
+def portfolio_solve(clauses, workers=None, configurations=None,
+                    propagation_limit=None, conflict_limit=None,
+                    deadline=None):
+    """
+    A `solver=` that runs several configurations (see
+    portfolio_configurations) in a process pool of `workers` processes
+    (one per CPU by default) and returns the first answer, terminating the
+    rest.
+    The limits apply to each configuration, UNKNOWN is returned if all of
+    them ran out. solve and Claused.solve pass the limits on as keyword
+    arguments, so give them functools.partial(portfolio_solve, workers=8)
+    or lambda x, **limits: portfolio_solve(x, 8, **limits).
+    """
+    limits = make_limits(propagation_limit, conflict_limit, deadline)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if configurations is None:
+        configurations = portfolio_configurations(workers)
+    if workers == 1 or len(configurations) == 1:
+        return run_configuration(clauses, configurations[0], limits)
+    pool = multiprocessing.Pool(min(workers, len(configurations)),
+                                _init_worker, (clauses, limits))
+    try:
+        for _, model in pool.imap_unordered(_run_worker, configurations):
+            if model is not UNKNOWN:
+                return model
+        return UNKNOWN
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def make_cubes(clauses, candidates, depth):
+    """
+    Split the problem into at most 2 ** depth cubes (lists of literals of
+    the candidate variables) that together cover every model.
+    Each split is on the candidate whose two literals imply the most
+    (the product of both counts, by lookahead). A literal whose lookahead
+    fails is added to the cube, and cubes that fail are dropped.
+    """
+    solver = CDCLSolver(clauses)
+    cubes = []
+    pending = [([], depth)]
+    while pending:
+        cube, depth = pending.pop()
+        implied = solver.probe(cube)
+        if implied is None:
+            continue
+        if not depth:
+            cubes.append(cube)
+            continue
+        assigned = set(abs(lit) for lit in implied)
+        best = None
+        for var in candidates:
+            if var in assigned:
+                continue
+            positive = solver.probe(cube + [var])
+            negative = solver.probe(cube + [-var])
+            if positive is None or negative is None:
+                if positive is not None:
+                    cube = cube + [var]
+                elif negative is not None:
+                    cube = cube + [-var]
+                else:
+                    best = None
+                    cube = None
+                    break
+                assigned.add(var)
+                continue
+            score = (len(positive) + 1) * (len(negative) + 1)
+            if best is None or score > best[0]:
+                best = score, var
+        if cube is None:
+            continue
+        if best is None:
+            cubes.append(cube)
+            continue
+        var = best[1]
+        pending.append((cube + [-var], depth - 1))
+        pending.append((cube + [var], depth - 1))
+    return cubes
+
+
+def _run_cube(cube):
+    return _worker_solver(_worker_clauses + [[lit] for lit in cube],
+                          **_worker_limits)
+
+
+def cube_and_conquer(clauses, candidates, depth, workers=None,
+                     solver=pycosat_solve, limits=None):
+    """
+    Solve the cubes of make_cubes with `solver` in a process pool of
+    `workers` processes (one per CPU by default). Returns the first model
+    found, terminating the other workers, or None once every cube turned
+    out unsatisfiable. `solver` has to be picklable (a module level
+    function), unless workers is 1.
+    The limits (keyword arguments for solver) apply to each cube; if some
+    cube ran out of them and none had a model the result is UNKNOWN.
+    """
+    if limits is None:
+        limits = {}
+    cubes = make_cubes(clauses, candidates, depth)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers == 1:
+        models = (solver(clauses + [[lit] for lit in cube], **limits)
+                  for cube in cubes)
+        return _first_model(models)
+    pool = multiprocessing.Pool(workers, _init_worker,
+                                (clauses, limits, solver))
+    try:
+        return _first_model(pool.imap_unordered(_run_cube, cubes))
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _first_model(models):
+    result = None
+    for model in models:
+        if model is UNKNOWN:
+            result = UNKNOWN
+        elif model is not None:
+            return model
+    return result
 
 
-def pycosat_solve(clauses, log=False):
-    model = pycosat.solve(clauses, verbose=log)
-    if model == "UNSAT":
-        return None
-    return model
+def iter_solutions(formula, assignment=None, project=None,
+                   encoding=DISTRIBUTE):
+    """
+    Yield models of the formula (as solve returns them) that differ on the
+    symbols in project (all the symbols of the formula by default), one at
+    a time. Only the projected symbols are blocked after each model.
+    """
+    if assignment is None:
+        assignment = {}
+    symbols = set(iter_symbols(formula))
+    if project is None:
+        project = list(symbols)
+    symbols.update(assignment)
+    symbols.update(project)
+    if encoding == DISTRIBUTE:
+        formula = formula.to_cnf()
+    clauses, names, reverse = to_clauses(formula, encoding)
+    add_symbols(symbols, names, reverse)
+    solver = CDCLSolver(clauses + assignment_to_clauses(assignment, names))
+    solver.reserve(len(reverse) - 1)
+    project = [names[symbol] for symbol in project]
+    for model in solver.iter_models(project):
+        yield _symbols_assignment(model, reverse, symbols)
+
+
+def add_symbols(symbols, names, reverse):
+    """
+    Give a new variable to each of the symbols that has none, because its
+    clauses folded away or it is not in the formula. Returns the new ones.
+    """
+    variables = []
+    for symbol in symbols:
+        if symbol not in names:
+            names[symbol] = len(reverse)
+            reverse.append(symbol)
+            variables.append(names[symbol])
+    return variables
+
+
+def _symbols_assignment(lits, reverse, symbols):
+    """
+    lits_to_assignment of the lits of the symbols in `symbols`, leaving out
+    the auxiliary variables of the encoding.
+    """
+    return lits_to_assignment((lit for lit in lits
+                               if reverse[abs(lit)] in symbols), reverse)
 
 
 def assignment_to_clauses(assignment, names):
@@ -142,26 +813,205 @@ def lits_to_assignment(lits, reverse):
     return assignment
 
 
-def solve(formula, assignment=None, solver=pycosat_solve):
+def make_limits(propagation_limit=None, conflict_limit=None, deadline=None):
+    """
+    The keyword arguments for a `solver=` with the limits that are set.
+    """
+    limits = {}
+    if propagation_limit is not None:
+        limits["propagation_limit"] = propagation_limit
+    if conflict_limit is not None:
+        limits["conflict_limit"] = conflict_limit
+    if deadline is not None:
+        limits["deadline"] = deadline
+    return limits
+
+
+def solve(formula, assignment=None, solver=pycosat_solve,
+          encoding=DISTRIBUTE, cube_depth=0, workers=None, split_on=None,
+          preprocess=False, propagation_limit=None, conflict_limit=None,
+          deadline=None, stats=None, cache=None, symbols=()):
+    """
+    With cube_depth > 0 the problem is split into cubes on the symbols in
+    split_on (for instance the bits of the Integer inputs, all the symbols
+    of the formula by default) that are solved in parallel, see
+    cube_and_conquer.
+    With preprocess the clauses go through a Preprocessor first.
+    The limits that are not None are passed on to `solver`, which returns
+    UNKNOWN (and so does solve) if one runs out. `deadline` is a
+    time.time() value.
+    A SolveStats passed as stats gets the time and memory of every phase
+    and the sizes of the problem along the way.
+    With a ResultCache as cache, the simplified clauses are only solved if
+    the cache has no result for them yet.
+    The model has a value for the Symbols of the formula and of the
+    assignment, not for the auxiliary ones of the encoding, and for the
+    Symbols in `symbols` that are not in the formula, like the bits that
+    constant folding took out of it (see ArithmeticExpression.get_symbols).
+    """
     if assignment is None:
         assignment = {}
+    if split_on is None:
+        split_on = iter_symbols(formula)
+    limits = make_limits(propagation_limit, conflict_limit, deadline)
+    counting = stats is not None
+    if stats is None:
+        stats = NO_STATS
+
+    if counting:
+        stats.count("formula_nodes", size(formula))
+    symbols = set(itertools.chain(iter_symbols(formula), symbols, assignment))
+    if encoding == DISTRIBUTE:
+        with stats.phase("to_cnf"):
+            formula = formula.to_cnf()
+        if counting:
+            stats.count("cnf_nodes", size(formula))
+    with stats.phase("to_clauses"):
+        clauses, names, reverse = to_clauses(formula, encoding)
+
+    with stats.phase("assignment_to_clauses"):
+        folded = add_symbols(symbols, names, reverse)
+        clauses += assignment_to_clauses(assignment, names)
+    if counting:
+        _count_clauses(stats, "", clauses)
+
+    with stats.phase("simplify_clauses"):
+        clauses, partial, free = simplify_clauses(clauses)
+        free.update(x for x in folded if reverse[x] not in assignment)
+    if counting:
+        _count_clauses(stats, "simplified_", clauses)
+    candidates = ()
+    if cube_depth:
+        variables = set(iter_vars(clauses))
+        candidates = [names[x] for x in split_on
+                      if x in names and names[x] in variables]
+    preprocessor = None
+    if preprocess and clauses and [] not in clauses:
+        with stats.phase("preprocess"):
+            preprocessor = Preprocessor(clauses, frozen=candidates)
+            clauses = preprocessor.run()
+        if counting:
+            _count_clauses(stats, "preprocessed_", clauses)
+
+    backend = solver
+    if cube_depth:
+        def backend(clauses, **limits):
+            return cube_and_conquer(clauses, candidates, cube_depth, workers,
+                                    solver, limits)
+    with stats.phase("solve"):
+        if [] in clauses:
+            model = None
+        elif not clauses:
+            model = []
+        elif cache is not None:
+            model = cache.solve(clauses, backend, **limits)
+        else:
+            model = backend(clauses, **limits)
+    if counting:
+        stats.result = "unsat" if model is None else \
+                       "unknown" if model is UNKNOWN else "sat"
+    if model is None or model is UNKNOWN:
+        return model
+
+    with stats.phase("lits_to_assignment"):
+        if preprocessor is not None:
+            model = preprocessor.extend_model(model)
+        assignment = _symbols_assignment(itertools.chain(model, partial,
+                                                         free),
+                                         reverse, symbols)
+    return assignment
 
-    formula = formula.to_cnf()
-    clauses, names, reverse = to_clauses(formula)
 
-    clauses += assignment_to_clauses(assignment, names)
+def _count_clauses(stats, prefix, clauses):
+    stats.count(prefix + "variables", len(set(iter_vars(clauses))))
+    stats.count(prefix + "clauses", len(clauses))
 
-    clauses, partial, free = simplify_clauses(clauses)
 
-    if [] in clauses:
+def _solve_assigned(clauses, lits, solver, limits):
+    """
+    Solve clauses with the literals in lits (None if they contradict what
+    the clauses force) as unit clauses. Returns the model together with the
+    literals simplification assigned and the variables it dropped.
+    """
+    if lits is None:
         return None
-    elif not clauses:
-        model = []
-    else:
-        model = solver(clauses)
-    if model is None:
+    clauses, partial, free = simplify_clauses(clauses +
+                                              [[lit] for lit in lits])
+    if [] in clauses:
         return None
+    model = solver(clauses, **limits) if clauses else []
+    if model is None or model is UNKNOWN:
+        return model
+    return list(itertools.chain(model, partial, free))
+
+
+def _run_assignment(task):
+    index, lits = task
+    return index, _solve_assigned(_worker_clauses, lits, _worker_solver,
+                                  _worker_limits)
+
+
+def solve_many(formula, assignments, solver=pycosat_solve,
+               encoding=DISTRIBUTE, workers=None, ordered=True,
+               chunksize=1, propagation_limit=None, conflict_limit=None,
+               deadline=None, symbols=()):
+    """
+    Yield what solve(formula, assignment, symbols=symbols) would return for
+    each of the assignments, encoding and simplifying the formula only once.
+    The solves run in a process pool of `workers` processes (one per CPU by
+    default), `solver` has to be picklable unless workers is 1.
+    The results come in the order of the assignments, or with ordered=False
+    as (index, result) pairs as soon as each is done. The limits apply to
+    each solve. Closing the generator terminates the pool.
+    """
+    limits = make_limits(propagation_limit, conflict_limit, deadline)
+    symbols = set(itertools.chain(iter_symbols(formula), symbols))
+    if encoding == DISTRIBUTE:
+        formula = formula.to_cnf()
+    clauses, names, reverse = to_clauses(formula, encoding)
+    # No pure literals: an assignment can force them the other way
+    clauses, partial, free = simplify_clauses(clauses, pure_literals=False)
+    free.update(add_symbols(symbols, names, reverse))
+    assignments = list(assignments)
+
+    def tasks():
+        for index, assignment in enumerate(assignments):
+            lits = [names[x] if value else -names[x]
+                    for x, value in assignment.iteritems() if x in names]
+            if any(-lit in partial for lit in lits):
+                lits = None
+            yield index, lits
+
+    def result(index, lits):
+        if lits is None or lits is UNKNOWN:
+            return lits
+        # The model has values for variables outside its clauses too
+        assignment = _symbols_assignment(itertools.chain(free, lits, partial),
+                                         reverse, symbols)
+        # The model agrees with the assignment, which can have symbols that
+        # are not in the formula or were simplified away
+        assignment.update(assignments[index])
+        return assignment
 
-    assignment = lits_to_assignment(itertools.chain(model, partial, free),
-                                    reverse)
-    return assignment
+    if [] in clauses:
+        results = ((index, None) for index, _ in tasks())
+        pool = None
+    elif workers == 1:
+        results = ((index, _solve_assigned(clauses, lits, solver, limits))
+                   for index, lits in tasks())
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _init_worker,
+                                    (clauses, limits, solver))
+        imap = pool.imap if ordered else pool.imap_unordered
+        results = imap(_run_assignment, tasks(), chunksize)
+    try:
+        for index, lits in results:
+            if ordered:
+                yield result(index, lits)
+            else:
+                yield index, result(index, lits)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
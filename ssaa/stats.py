@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation for solve: wall time of every phase of the pipeline and
+how much it raised the peak memory of the process, and the sizes of the
+formula and the clauses along the way.
+"""
+import contextlib
+import time
+
+try:
+    import resource
+except ImportError:  # Not on Windows, no memory figures there
+    resource = None
+
+
+def peak_rss():
+    """
+    Peak resident set size of the process so far (kilobytes on Linux,
+    bytes on OS X), None without the resource module.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PhaseStats(object):
+    """
+    peak_rss_increase is how much the phase raised the peak resident set
+    size of the process (see peak_rss), None without the resource module.
+    A phase that stays under the peak of an earlier one shows 0.
+    """
+    def __init__(self, name, seconds, peak_rss_increase):
+        self.name = name
+        self.seconds = seconds
+        self.peak_rss_increase = peak_rss_increase
+
+    def __repr__(self):
+        return "PhaseStats({!r}, {:.6f}, {!r})".format(self.name,
+                                                        self.seconds,
+                                                        self.peak_rss_increase)
+
+
+class SolveStats(object):
+    """
+    Filled in by solve(stats=...): the phases (PhaseStats, in order), the
+    counts (formula nodes, variables and clauses before and after each
+    simplification) and the result ("sat", "unsat" or "unknown").
+    `callback` is called with each PhaseStats as soon as the phase ends.
+    peak_rss is the peak of the process when the last phase ended.
+    """
+    def __init__(self, callback=None):
+        self.phases = []
+        self.counts = {}
+        self.result = None
+        self.peak_rss = None
+        self.callback = callback
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.time()
+        before = peak_rss()
+        try:
+            yield
+        finally:
+            self.peak_rss = peak_rss()
+            increase = None
+            if self.peak_rss is not None:
+                increase = self.peak_rss - before
+            record = PhaseStats(name, time.time() - start, increase)
+            self.phases.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def seconds(self, name=None):
+        """
+        Time spent in the phases called name (in all of them by default).
+        """
+        return sum(x.seconds for x in self.phases
+                   if name is None or x.name == name)
+
+    def as_dict(self):
+        """
+        Everything as a flat dict, for monitoring systems.
+        """
+        result = dict(self.counts)
+        for record in self.phases:
+            key = record.name + "_seconds"
+            result[key] = result.get(key, 0) + record.seconds
+            if record.peak_rss_increase is not None:
+                key = record.name + "_peak_rss_increase"
+                result[key] = result.get(key, 0) + record.peak_rss_increase
+        result["seconds"] = self.seconds()
+        if self.peak_rss is not None:
+            result["peak_rss"] = self.peak_rss
+        result["result"] = self.result
+        return result
+
+
+class _NoStats(object):
+    """
+    Stands in for SolveStats when nobody asked for them.
+    """
+    @contextlib.contextmanager
+    def phase(self, name):
+        yield
+
+    def count(self, name, value):
+        pass
+
+
+NO_STATS = _NoStats()
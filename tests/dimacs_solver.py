@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for an external solver binary in test_solver: reads DIMACS from
+stdin and answers in the SAT competition format, with the built-in CDCL
+solver.
+
+    python dimacs_solver.py [--sleep seconds] [--unknown]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from ssaa.cdcl import cdcl_solve
+from ssaa.dimacs import read_dimacs
+
+
+def main(args):
+    clauses = read_dimacs(sys.stdin)
+    if "--sleep" in args:
+        time.sleep(float(args[args.index("--sleep") + 1]))
+    if "--unknown" in args:
+        print "s UNKNOWN"
+        return 0
+    model = cdcl_solve(clauses)
+    if model is None:
+        print "s UNSATISFIABLE"
+        return 20
+    print "s SATISFIABLE"
+    for i in xrange(0, len(model), 10):
+        print "v " + " ".join(map(str, model[i:i + 10]))
+    print "v 0"
+    return 10
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+from ssaa.aig import AndInverterGraph, from_constraints, FALSE_LITERAL, \
+                     TRUE_LITERAL
+from ssaa.random_formula import random_formula, random_assignment
+from ssaa.propositional_logic import Symbol, Iff, to_clauses, TSEITIN, \
+                                     AND_INVERTER
+from ssaa.sat_arithmetic import Integer
+from ssaa.clause import Claused
+
+
+class TestAndInverterGraph(unittest.TestCase):
+    def test_structural_hashing(self):
+        graph = AndInverterGraph()
+        a = graph.input(Symbol())
+        b = graph.input(Symbol())
+        self.assertEqual(graph.and_(a, b), graph.and_(b, a))
+        self.assertEqual(graph.xor(a, b), graph.xor(b, a))
+        self.assertEqual(graph.iff(a, b), graph.xor(a, b) ^ 1)
+        self.assertEqual(len(graph), 6)  # FALSE, a, b and the xor
+
+    def test_rewriting(self):
+        graph = AndInverterGraph()
+        a, b, c = [graph.input(Symbol()) for _ in xrange(3)]
+        ab = graph.and_(a, b)
+        self.assertEqual(graph.and_(a, a ^ 1), FALSE_LITERAL)
+        self.assertEqual(graph.and_(a, TRUE_LITERAL), a)
+        self.assertEqual(graph.and_(ab, a ^ 1), FALSE_LITERAL)
+        self.assertEqual(graph.and_(ab, a), ab)
+        self.assertEqual(graph.and_(ab ^ 1, a ^ 1), a ^ 1)
+        self.assertEqual(graph.and_(ab ^ 1, a), graph.and_(a, b ^ 1))
+        self.assertEqual(graph.and_(ab, graph.and_(a ^ 1, c)), FALSE_LITERAL)
+        self.assertEqual(graph.and_(ab ^ 1, graph.and_(a, b ^ 1) ^ 1), a ^ 1)
+        self.assertEqual(graph.xor(a, a), FALSE_LITERAL)
+        self.assertEqual(graph.xor(a, FALSE_LITERAL), a)
+
+    def test_lowering_is_equivalent(self):
+        random.seed("Bohemian Rhapsody")
+        for depth in xrange(8):
+            for _ in xrange(10):
+                formula = random_formula(depth)
+                graph = AndInverterGraph()
+                lit = graph.add_formula(formula)
+                back = graph.to_formula(lit)
+                for _ in xrange(10):
+                    a = random_assignment(formula)
+                    value = formula.evaluate(a)
+                    self.assertEqual(graph.evaluate(lit, a), value)
+                    self.assertEqual(back.evaluate(a), value)
+
+    def test_definitions(self):
+        a, b, c, d = [Symbol() for _ in xrange(4)]
+        graph = from_constraints(Iff(c, a & b) & Iff(d, -c) & (d | a))
+        self.assertEqual(graph.literal(d), graph.literal(c) ^ 1)
+        self.assertEqual(len(graph.assertions), 1)
+        # c is defined through itself, so it stays an input
+        graph = from_constraints(Iff(c, a & -c) & Iff(d, c))
+        self.assertEqual(graph.literal(d), graph.literal(c))
+        self.assertEqual(graph.inputs[graph.literal(c) >> 1], c)
+        self.assertEqual(len(graph.assertions), 1)
+
+    def test_multiplier(self):
+        a = Integer(6)
+        b = Integer(6)
+        c = a * b
+        formula = c.get_propositional_formula()
+        clauses, _, reverse = to_clauses(formula, AND_INVERTER)
+        tseitin, _, tseitin_reverse = to_clauses(formula, TSEITIN)
+        self.assertLess(len(reverse), len(tseitin_reverse))
+        self.assertLess(len(clauses), len(tseitin))
+        x = Claused(formula, {"a": a, "b": b, "c": c}, encoding=AND_INVERTER)
+        x.a = 5
+        x.b = 11
+        self.assertTrue(x.solve())
+        self.assertEqual(x.c, 55)
+        x.reset_assignment()
+        x.c = 35
+        x.a = 7
+        self.assertTrue(x.solve())
+        self.assertEqual(x.b, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
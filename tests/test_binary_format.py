@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+import tempfile
+from ssaa.sat_arithmetic import Integer
+from ssaa.solver import solve
+from ssaa.random_formula import random_formula
+from ssaa.propositional_logic import rformula, TRUE
+from ssaa.binary_format import dump, load
+
+
+class TestBinaryFormat(unittest.TestCase):
+    def test_formulas_round_trip(self):
+        random.seed("Wish you were here")
+        for depth in xrange(8):
+            formula = random_formula(depth)
+            loaded, relevant_io = self.round_trip(formula)
+            self.assertEqual(rformula(loaded), rformula(formula))
+            self.assertEqual(relevant_io, {})
+        loaded, _ = self.round_trip(TRUE)
+        self.assertIs(loaded, TRUE)
+
+    def test_circuit_round_trip(self):
+        a = Integer(6)
+        b = Integer(6)
+        c = a * b
+        lt = a < b
+        unused = Integer(3)
+        formula = c.get_propositional_formula() & \
+                  lt.get_propositional_formula()
+        formula, io = self.round_trip(formula, {"a": a, "b": b, "c": c,
+                                                "lt": lt, "unused": unused})
+        self.assertEqual(sorted(io), ["a", "b", "c", "lt", "unused"])
+        self.assertEqual(len(io["unused"].bits), 3)
+        assignment = {}
+        assignment.update(io["a"].build_assignment(7))
+        assignment.update(io["b"].build_assignment(9))
+        model = solve(formula, assignment)
+        self.assertEqual(io["c"].recover_value(model), 63)
+        self.assertEqual(io["lt"].recover_value(model), True)
+
+    def round_trip(self, formula, relevant_io=None):
+        with tempfile.TemporaryFile() as f:
+            dump(f, formula, relevant_io)
+            f.seek(0)
+            return load(f)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+import shutil
+import tempfile
+from ssaa.cache import canonicalize, ResultCache, MISSING
+from ssaa.solver import solve, is_theorem, pycosat_solve
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import TSEITIN, Symbol
+from ssaa.random_formula import random_clauses
+
+
+def factor_query(n):
+    a = Integer(8)
+    b = Integer(8)
+    c = a * b
+    return c.get_propositional_formula(), c.build_assignment(n), a, b
+
+
+class TestCanonicalize(unittest.TestCase):
+    def test_renaming(self):
+        random.seed("Clocks")
+        for _ in xrange(50):
+            n = random.randint(3, 30)
+            clauses = random_clauses(n, 3 * n)
+            names = range(1, n + 1)
+            random.shuffle(names)
+            renamed = [[names[abs(x) - 1] * (1 if x > 0 else -1)
+                        for x in clause] for clause in clauses]
+            key, renumbering = canonicalize(clauses)
+            other, other_renumbering = canonicalize(renamed)
+            self.assertEqual(key, other)
+            for var in renumbering:
+                self.assertEqual(renumbering[var],
+                                 other_renumbering[names[var - 1]])
+            self.assertNotEqual(key, canonicalize(clauses + [[1, 2]])[0])
+        clauses = [[1, -2], [2, 3], [-3, -1, 2]]
+        shuffled = [[-1, 2, -3], [3, 2], [-2, 1]]
+        self.assertEqual(canonicalize(clauses)[0],
+                         canonicalize(shuffled)[0])
+        self.assertNotEqual(canonicalize([[1, 2]])[0],
+                            canonicalize([[1, -2]])[0])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lru(self):
+        cache = ResultCache(capacity=2)
+        cache.put("a", [1])
+        cache.put("b", None)
+        self.assertEqual(cache.get("a"), [1])
+        cache.put("c", [-1, 2])
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("c"), [-1, 2])
+
+    def test_disk(self):
+        cache = ResultCache(capacity=1, directory=self.directory)
+        cache.put("ab12", [1, -2])
+        cache.put("cd34", None)
+        cache = ResultCache(directory=self.directory)
+        self.assertEqual(cache.get("ab12"), [1, -2])
+        self.assertIsNone(cache.get("cd34"))
+        self.assertIs(cache.get("ef56"), MISSING)
+
+    def test_solve(self):
+        cache = ResultCache(directory=self.directory)
+        calls = []
+
+        def solver(clauses):
+            calls.append(clauses)
+            return pycosat_solve(clauses)
+
+        for _ in xrange(3):  # Fresh Symbols every time
+            formula, assignment, a, b = factor_query(141)
+            model = solve(formula, assignment, solver=solver,
+                          encoding=TSEITIN, cache=cache)
+            self.assertEqual(a.recover_value(model) * b.recover_value(model)
+                             % 256, 141)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        unsat = [[1, 2], [-1, 2], [1, -2], [-1, -2, 3], [-1, -2, -3]]
+        for _ in xrange(2):
+            self.assertIsNone(ResultCache(directory=self.directory).solve(
+                unsat, solver))
+        self.assertEqual(len(calls), 2)
+        x = Symbol()
+        y = Symbol()
+        self.assertTrue(is_theorem(x | -x | y, cache=cache))
+        self.assertFalse(is_theorem(x | y, cache=cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
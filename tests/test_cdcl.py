@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+try:
+    import pycosat
+except ImportError:  # Only needed to cross-check the answers
+    pycosat = None
+from ssaa.cdcl import CDCLSolver, cdcl_solve, luby
+from ssaa.solver import solve
+from ssaa.sat_arithmetic import Integer
+from ssaa.random_formula import random_clauses, pigeonhole
+from ssaa.propositional_logic import TSEITIN, AND_INVERTER, to_clauses
+from ssaa.clause import Claused
+
+
+class TestCDCL(unittest.TestCase):
+    def test_luby(self):
+        self.assertEqual([luby(i) for i in xrange(15)],
+                         [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+    @unittest.skipIf(pycosat is None, "pycosat is not installed")
+    def test_agrees_with_pycosat(self):
+        random.seed("Light My Fire")
+        for _ in xrange(100):
+            n = random.randint(5, 50)
+            clauses = random_clauses(n, int(random.uniform(3.5, 5) * n))
+            model = cdcl_solve(clauses)
+            self.assertEqual(model is None, pycosat.solve(clauses) == "UNSAT")
+            if model is not None:
+                self.assertSatisfies(clauses, model)
+
+    @unittest.skipIf(pycosat is None, "pycosat is not installed")
+    def test_clause_deletion(self):
+        random.seed("Purple Haze")
+        for _ in xrange(10):
+            clauses = random_clauses(100, 426)
+            solver = CDCLSolver(clauses)
+            solver.max_learnts = 20
+            result = solver.solve()
+            self.assertEqual(result, pycosat.solve(clauses) != "UNSAT")
+            if result:
+                self.assertSatisfies(clauses, solver.model)
+
+    @unittest.skipIf(pycosat is None, "pycosat is not installed")
+    def test_incremental_with_assumptions(self):
+        random.seed("Born to Run")
+        clauses = random_clauses(40, 152)
+        solver = CDCLSolver(clauses)
+        for _ in xrange(50):
+            assumptions = random.sample(xrange(1, 41), 4)
+            assumptions = [random.choice([-1, 1]) * x for x in assumptions]
+            result = solver.solve(assumptions)
+            units = [[x] for x in assumptions]
+            self.assertEqual(result, pycosat.solve(clauses + units) != "UNSAT")
+            if result:
+                self.assertSatisfies(clauses + units, solver.model)
+            if random.random() < 0.3:
+                clause, = random_clauses(40, 1)
+                clauses.append(clause)
+                solver.add_clause(clause)
+
+    def test_unsat_and_limits(self):
+        clauses, _, _ = to_clauses(pigeonhole(7).to_cnf())
+        self.assertIsNone(cdcl_solve(clauses))
+        clauses, _, _ = to_clauses(pigeonhole(9).to_cnf())
+        solver = CDCLSolver(clauses)
+        self.assertIsNone(solver.solve(conflict_limit=50))
+        self.assertEqual(solver.conflicts, 50)
+        self.assertIsNone(solver.solve(propagation_limit=100))
+        self.assertIsNone(solver.solve(deadline=0))
+
+    def test_phases(self):
+        solver = CDCLSolver([[1, 2, 3]])
+        for lit in (1, -2, 3):
+            solver.set_phase(lit)
+        self.assertTrue(solver.solve())
+        self.assertEqual(solver.model, [1, -2, 3])
+        self.assertEqual(cdcl_solve([[1, 2]], phases=[-1, 2]), [-1, 2])
+
+    def test_solver_hook(self):
+        a = Integer(8)
+        b = Integer(8)
+        c = a * b
+        formula = c.get_propositional_formula()
+        for encoding in (TSEITIN, AND_INVERTER):
+            assignment = a.build_assignment(13)
+            assignment.update(c.build_assignment(169))
+            model = solve(formula, assignment, solver=cdcl_solve,
+                          encoding=encoding)
+            self.assertEqual(b.recover_value(model) * 13 % 256, 169)
+        x = Claused(formula, {"a": a, "b": b, "c": c}, encoding=AND_INVERTER)
+        x.a = 7
+        x.b = 9
+        self.assertTrue(x.solve(solver=cdcl_solve))
+        self.assertEqual(x.c, 63)
+
+    def test_probe(self):
+        solver = CDCLSolver([[-1, 2], [-2, 3], [-1, -3, 4], [-4, -5]])
+        self.assertEqual(solver.probe([1]), [1, 2, 3, 4, -5])
+        self.assertEqual(solver.probe([5]), [5, -4])
+        self.assertIsNone(solver.probe([5, 1]))
+        self.assertTrue(solver.solve([5]))
+        solver.add_clause([-5])
+        self.assertEqual(solver.probe([]), [])
+        self.assertEqual(solver.probe([-5]), [])
+
+    def assertSatisfies(self, clauses, model):
+        model = set(model)
+        for clause in clauses:
+            self.assertTrue(any(x in model for x in clause))
+
+
+if __name__ == "__main__":
+    unittest.main()
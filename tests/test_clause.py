@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+import time
+import StringIO
+from ssaa.clause import Claused
+from ssaa.cdcl import cdcl_solve, UNKNOWN
+from ssaa.sat_arithmetic import Integer, constant_integer
+from ssaa.random_formula import pigeonhole
+from ssaa.propositional_logic import TSEITIN, AND_INVERTER, Symbol, And
+
+
+class TestClaused(unittest.TestCase):
+    def test_folded_symbols(self):
+        a = Integer(4)
+        c = a & 0
+        x = Claused(c.get_propositional_formula(), {"a": a, "c": c})
+        self.assertTrue(x.solve())
+        self.assertEqual(x.c, 0)
+        x.a = 5
+        self.assertTrue(x.solve())
+        self.assertEqual(x.a, 5)
+
+
+class TestIncrementalClaused(unittest.TestCase):
+    def test_same_answers(self):
+        random.seed("Hey Jude")
+        for encoding in (TSEITIN, AND_INVERTER):
+            a = Integer(6)
+            b = Integer(6)
+            c = a * b
+            io = {"a": a, "b": b, "c": c}
+            formula = c.get_propositional_formula()
+            incremental = Claused(formula, io, encoding, incremental=True)
+            fresh = Claused(formula, io, encoding)
+            sessions = set()
+            for _ in xrange(20):
+                va = random.randint(0, 63)
+                vc = random.randint(0, 63)
+                for x in (incremental, fresh):
+                    x.reset_assignment()
+                    x.a = va
+                    x.c = vc
+                found = incremental.solve()
+                sessions.add(incremental._session[0])
+                self.assertEqual(found, fresh.solve())
+                if found:
+                    self.assertEqual(incremental.a, va)
+                    self.assertEqual(incremental.c, vc)
+                    self.assertEqual(incremental.a * incremental.b % 64, vc)
+            self.assertEqual(len(sessions), 1)
+
+    def test_add_constraint(self):
+        a = Integer(8)
+        b = Integer(8)
+        c = a * b
+        x = Claused(c.get_propositional_formula(), {"a": a, "b": b, "c": c},
+                    TSEITIN, incremental=True)
+        x.c = 143
+        self.assertTrue(x.solve())
+        self.assertEqual(x.a * x.b % 256, 143)
+        for y in (a, b):
+            gt = y > constant_integer(1, 8)
+            x.add_constraint(gt.get_propositional_formula() & gt.bit)
+            lt = y < constant_integer(16, 8)
+            x.add_constraint(lt.get_propositional_formula() & lt.bit)
+        x.reset_assignment()
+        x.c = 143
+        self.assertTrue(x.solve())
+        self.assertEqual(sorted([x.a, x.b]), [11, 13])
+        x.reset_assignment()
+        x.c = 13
+        self.assertFalse(x.solve())
+
+
+class TestIterSolutions(unittest.TestCase):
+    def test_factor_pairs(self):
+        for incremental in (False, True):
+            a = Integer(5)
+            b = Integer(5)
+            c = a * b
+            x = Claused(c.get_propositional_formula(),
+                        {"a": a, "b": b, "c": c}, AND_INVERTER,
+                        incremental=incremental)
+            x.c = 12
+            expected = [(va, vb) for va in xrange(32) for vb in xrange(32)
+                        if va * vb % 32 == 12]
+            pairs = [(s["a"], s["b"]) for s in x.iter_solutions(["a", "b"])]
+            self.assertEqual(sorted(pairs), expected)
+            factors = [s["a"] for s in x.iter_solutions(["a"])]
+            self.assertEqual(sorted(factors),
+                             sorted(set(va for va, _ in expected)))
+            solution, = x.iter_solutions(["c"])
+            self.assertEqual(solution, {"c": 12})
+            # The blocking clauses are gone afterwards
+            x.a = 6
+            self.assertTrue(x.solve())
+            self.assertIn((6, x.b), expected)
+
+
+    def test_dump_after_iter_solutions(self):
+        for incremental in (False, True):
+            a = Integer(4)
+            b = Integer(4)
+            c = a * b
+            io = {"a": a, "b": b, "c": c, "unused": Integer(2)}
+            x = Claused(c.get_propositional_formula(), io, TSEITIN,
+                        incremental=incremental)
+            reverse = list(x.reverse)
+            x.c = 6
+            # unused is not in the formula: a free variable, which the
+            # assignment fixes like the other ones
+            solutions = list(x.iter_solutions(["a", "unused"]))
+            self.assertEqual(set(s["unused"] for s in solutions), set([3]))
+            self.assertEqual(len(solutions), len(set(
+                va for va in xrange(16) for vb in xrange(16)
+                if va * vb % 16 == 6)))
+            self.assertEqual(x.reverse, reverse)
+            self.assertTrue(x.solve())
+            fout = StringIO.StringIO()
+            x.dump(fout)
+            self.assertEqual(len(fout.getvalue()), (len(reverse) + 6) // 8)
+            va = x.a
+            x.reset_assignment()
+            x.load(StringIO.StringIO(fout.getvalue()))
+            self.assertEqual(x.a, va)
+            # New symbols don't take the variable of the retired guard
+            x.add_constraint(And(*[Symbol() for _ in xrange(5)]))
+            x.reset_assignment()
+            x.c = 6
+            self.assertTrue(x.solve())
+
+
+class TestLimits(unittest.TestCase):
+    def test_unknown(self):
+        a = Integer(12)
+        b = Integer(12)
+        c = a * b
+        formula = c.get_propositional_formula()
+        for incremental in (False, True):
+            x = Claused(formula, {"a": a, "b": b, "c": c}, encoding=TSEITIN,
+                        incremental=incremental)
+            x.c = 1361 * 3
+            x.a = 3
+            self.assertIs(x.solve(deadline=time.time() + 60), True)
+            self.assertEqual(x.b, 1361)
+            for n, result in ((4, False), (11, UNKNOWN)):
+                x = Claused(pigeonhole(n), encoding=TSEITIN,
+                            incremental=incremental)
+                for solver in (None, cdcl_solve):
+                    self.assertIs(x.solve(solver, conflict_limit=1000),
+                                  result)
+
+
+if __name__ == "__main__":
+    unittest.main()
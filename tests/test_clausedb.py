@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+import pickle
+import StringIO
+import ssaa.clausedb
+from ssaa.clausedb import ClauseDB
+from ssaa.solver import simplify_clauses, reduce_clauses_with_assignment, \
+                        iter_vars, iter_unit_literals, iter_pure_literals, \
+                        to_dimacs, pycosat_solve, run_configuration, CDCL
+from ssaa.cdcl import cdcl_solve
+from ssaa.cache import canonicalize
+from ssaa.dimacs import DimacsReader
+from ssaa.preprocess import Preprocessor
+from ssaa.clause import Claused
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import TSEITIN
+from ssaa.random_formula import random_clauses
+
+
+class TestClauseDB(unittest.TestCase):
+    def test_sequence(self):
+        clauses = [[1, -2], [3], [], [-1, 2, -3]]
+        db = ClauseDB(clauses)
+        self.assertEqual(len(db), 4)
+        self.assertEqual(list(db), clauses)
+        self.assertEqual(db, clauses)
+        self.assertEqual(db[1], [3])
+        self.assertEqual(db[-1], [-1, 2, -3])
+        self.assertEqual(db[1:3], [[3], []])
+        self.assertRaises(IndexError, lambda: db[4])
+        self.assertTrue([] in db)
+        self.assertTrue([3] in db)
+        self.assertFalse([] in ClauseDB([[1]]))
+        self.assertEqual(db + [[4]], clauses + [[4]])
+        self.assertEqual([[4]] + db, [[4]] + clauses)
+        self.assertTrue(isinstance([[4]] + db, ClauseDB))
+        db += ClauseDB([[5, 6]])
+        self.assertEqual(db, clauses + [[5, 6]])
+        self.assertEqual(pickle.loads(pickle.dumps(db)), db)
+        self.assertEqual(db.nbytes, 4 * 8 + db.offsets.itemsize * 6)
+        copy = ClauseDB.from_arrays(db.literals, db.offsets)
+        self.assertEqual(copy, db)
+        self.assertFalse(copy != db)
+        self.assertTrue(copy != clauses)
+        self.assertFalse(db != clauses + [[5, 6]])
+        self.assertRaises(TypeError, hash, db)
+        self.assertRaises(ValueError, ClauseDB.from_arrays, [1, 2], [0, 1])
+
+    def test_vectorized(self):
+        random.seed("Time")
+        numpy = ssaa.clausedb.numpy
+        try:
+            for module_numpy in set([numpy, None]):
+                ssaa.clausedb.numpy = module_numpy
+                for _ in xrange(20):
+                    n = random.randint(1, 20)
+                    clauses = random_clauses(n, random.randint(0, 40), (0, 4))
+                    db = ClauseDB(clauses)
+                    self.assertEqual(db.lengths(), [len(x) for x in clauses])
+                    positive, negative = db.literal_counts()
+                    counts = db.variable_counts()
+                    for var in xrange(1, db.max_variable() + 1):
+                        lits = [x for c in clauses for x in c]
+                        self.assertEqual(positive[var], lits.count(var))
+                        self.assertEqual(negative[var], lits.count(-var))
+                        self.assertEqual(counts[var],
+                                         positive[var] + negative[var])
+                    self.assertEqual(db.variables(), set(iter_vars(clauses)))
+                    keep = [random.random() < 0.5 for _ in clauses]
+                    self.assertEqual(db.filter(keep),
+                                     [c for c, k in zip(clauses, keep) if k])
+                    lits = set(random.choice([-1, 1]) * random.randint(1, n)
+                               for _ in xrange(3))
+                    lits = set(x for x in lits if -x not in lits)
+                    self.assertEqual(db.reduce(lits),
+                                     [[x for x in c if -x not in lits]
+                                      for c in clauses
+                                      if not any(x in lits for x in c)])
+        finally:
+            ssaa.clausedb.numpy = numpy
+
+    def test_accepted_as_clauses(self):
+        random.seed("Echoes")
+        for _ in xrange(20):
+            n = random.randint(3, 20)
+            clauses = random_clauses(n, 4 * n, (1, 4))
+            db = ClauseDB(clauses)
+            self.assertEqual(simplify_clauses(db), simplify_clauses(clauses))
+            self.assertEqual(reduce_clauses_with_assignment(db, set([1])),
+                             reduce_clauses_with_assignment(clauses,
+                                                            set([1])))
+            self.assertEqual(set(iter_unit_literals(db)),
+                             set(iter_unit_literals(clauses)))
+            self.assertEqual(set(iter_pure_literals(db)),
+                             set(iter_pure_literals(clauses)))
+            self.assertEqual(to_dimacs(db), to_dimacs(clauses))
+            self.assertEqual(ClauseDB(DimacsReader(StringIO.StringIO(
+                to_dimacs(db)))), db)
+            self.assertEqual(canonicalize(db), canonicalize(clauses))
+            self.assertEqual(Preprocessor(db).run(),
+                             Preprocessor(clauses).run())
+            sat = pycosat_solve(clauses) is not None
+            for solver in (pycosat_solve, cdcl_solve,
+                           lambda x: run_configuration(x, (CDCL, 1))):
+                model = solver(db)
+                self.assertEqual(model is not None, sat)
+                if model is not None:
+                    model = set(model)
+                    self.assertTrue(all(any(x in model for x in c)
+                                        for c in clauses))
+
+    def test_claused(self):
+        a = Integer(6)
+        b = Integer(6)
+        c = a * b
+        x = Claused(c.get_propositional_formula(), {"a": a, "b": b, "c": c},
+                    encoding=TSEITIN)
+        self.assertTrue(isinstance(x.clauses, ClauseDB))
+        x.a = 5
+        x.simplify()
+        self.assertTrue(isinstance(x.clauses, ClauseDB))
+        x.c = 35
+        self.assertTrue(x.solve())
+        self.assertEqual(x.b, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
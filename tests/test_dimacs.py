@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+import os
+import gzip
+import shutil
+import tempfile
+import StringIO
+from ssaa.dimacs import DimacsReader, read_dimacs, write_dimacs, \
+                        read_solution, open_dimacs
+from ssaa.solver import to_dimacs, from_dimacs
+from ssaa.random_formula import random_clauses
+
+
+class TestDimacs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse(self):
+        text = ("c A comment\n"
+                "c\n"
+                "p cnf 5 4\n"
+                "1 -2\n"
+                "  3 0 -4\n"
+                "5 0 c Not a comment, but this line has no clause left\n"
+                "\n"
+                "-1 0 2 -3 4")
+        self.assertRaises(ValueError, read_dimacs, StringIO.StringIO(text))
+        text = text.replace("c Not", "\nc Not")
+        reader = DimacsReader(StringIO.StringIO(text), block_size=7)
+        self.assertEqual(list(reader), [[1, -2, 3], [-4, 5], [-1],
+                                        [2, -3, 4]])
+        self.assertEqual((reader.variables, reader.clauses), (5, 4))
+        self.assertEqual(reader.comments[0], "A comment")
+        satlib = "p cnf 2 1\n1 2 0\n%\n0\n\n"
+        self.assertEqual(read_dimacs(StringIO.StringIO(satlib)), [[1, 2]])
+        self.assertRaises(ValueError, read_dimacs,
+                          StringIO.StringIO("p dnf 1 1\n1 0\n"))
+
+    def test_round_trip(self):
+        random.seed("Wish You Were Here")
+        for block_size in (1, 13, 1 << 20):
+            clauses = random_clauses(50, 300, (1, 5))
+            fout = StringIO.StringIO()
+            write_dimacs(fout, clauses)
+            self.assertEqual(fout.getvalue(), to_dimacs(clauses))
+            reader = DimacsReader(StringIO.StringIO(fout.getvalue()),
+                                  block_size)
+            self.assertEqual(list(reader), clauses)
+            self.assertEqual(reader.clauses, len(clauses))
+            self.assertEqual(reader.variables,
+                             max(abs(x) for c in clauses for x in c))
+        self.assertEqual(to_dimacs([]), "c ssaa\np cnf 0 0\n")
+
+    def test_gzip(self):
+        random.seed("Shine On You Crazy Diamond")
+        clauses = random_clauses(100, 1000, (1, 5))
+        for name in ("plain.cnf", "compressed.cnf.gz"):
+            path = os.path.join(self.directory, name)
+            fout = open_dimacs(path, "w")
+            write_dimacs(fout, clauses, comments=[])
+            fout.close()
+            fin = open_dimacs(path)
+            self.assertEqual(read_dimacs(fin), clauses)
+            fin.close()
+        path = os.path.join(self.directory, "compressed.cnf.gz")
+        with gzip.open(path) as fin:
+            self.assertTrue(fin.read().startswith("p cnf 100 1000\n"))
+        renamed = os.path.join(self.directory, "compressed.cnf")
+        os.rename(path, renamed)
+        fin = open_dimacs(renamed)
+        self.assertEqual(read_dimacs(fin), clauses)
+        fin.close()
+
+    def test_solutions(self):
+        output = ("c Some solver\n"
+                  "s SATISFIABLE\n"
+                  "v 1 -2 3\n"
+                  "v -4 5 0\n")
+        self.assertEqual(read_solution(StringIO.StringIO(output)),
+                         (True, [1, -2, 3, -4, 5]))
+        self.assertEqual(list(from_dimacs(StringIO.StringIO(output))),
+                         [1, -2, 3, -4, 5])
+        self.assertEqual(list(from_dimacs(["v 1\n", "v -2\n", "v 0\n"])),
+                         [1, -2])
+        self.assertEqual(read_solution(["s UNSATISFIABLE\n"]), (False, []))
+        self.assertEqual(read_solution(["s UNKNOWN\n"]), (None, []))
+        self.assertEqual(read_solution([]), (None, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import unittest
+import random
+from ssaa.preprocess import Preprocessor
+from ssaa.solver import pycosat_solve, solve, simplify_clauses, \
+                        assignment_to_clauses
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import TSEITIN, AND_INVERTER
+from ssaa.random_formula import random_clauses
+
+
+class TestPreprocessor(unittest.TestCase):
+    def test_equivalences(self):
+        clauses = [[-1, 2], [-2, 3], [-3, 1], [1, 4, 5], [-3, -4, 5]]
+        preprocessor = Preprocessor(clauses, frozen=[1, 4])
+        preprocessor.substitute_equivalences()
+        remaining = [x for x in preprocessor.clauses if x is not None]
+        self.assertEqual(sorted(sorted(x) for x in remaining),
+                         [[-4, -1, 5], [1, 4, 5]])
+        self.assertEqual(Preprocessor([[-1, 2], [-2, -1], [1, 2],
+                                       [-2, 1]]).run(), [[]])
+
+    def test_subsumption(self):
+        preprocessor = Preprocessor([[1, 2], [1, 2, 3], [-1, 2, 4]],
+                                    frozen=[1, 2, 3, 4])
+        self.assertEqual(sorted(sorted(x) for x in preprocessor.run()),
+                         [[1, 2], [2, 4]])
+
+    def test_elimination(self):
+        preprocessor = Preprocessor([[1, 2], [-1, 3]], frozen=[2, 3])
+        self.assertEqual(preprocessor.run(), [[2, 3]])
+        model = preprocessor.extend_model([2, -3])
+        self.assertEqual(model, [-1, 2, -3])
+
+    def test_random(self):
+        random.seed("Bohemian Rhapsody")
+        for _ in xrange(300):
+            n = random.randint(3, 25)
+            clauses = random_clauses(n, random.randint(1, 4 * n), (1, 4))
+            frozen = random.sample(range(1, n + 1), random.randint(0, 3))
+            preprocessor = Preprocessor(clauses, frozen)
+            simple = preprocessor.run()
+            sat = pycosat_solve(clauses) is not None
+            if [] in simple:
+                self.assertFalse(sat)
+                continue
+            model = pycosat_solve(simple) if simple else []
+            self.assertEqual(model is not None, sat)
+            if model is not None:
+                model = set(preprocessor.extend_model(model))
+                for clause in clauses:
+                    self.assertTrue(any(x in model for x in clause))
+
+    def test_multiplier(self):
+        a = Integer(8)
+        b = Integer(8)
+        c = a * b
+        formula = c.get_propositional_formula()
+        clauses, names, _ = formula.to_clauses(TSEITIN)
+        clauses += assignment_to_clauses(c.build_assignment(143), names)
+        clauses, _, _ = simplify_clauses(clauses)
+        simple = Preprocessor(clauses).run()
+        self.assertTrue(len(simple) < len(clauses) / 2)
+        for encoding in (TSEITIN, AND_INVERTER):
+            assignment = c.build_assignment(143)
+            assignment.update(a.build_assignment(11))
+            model = solve(formula, assignment, encoding=encoding,
+                          preprocess=True)
+            self.assertEqual(b.recover_value(model), 13)
+            self.assertEqual(c.recover_value(model), 143)
+            assignment.update(b.build_assignment(12))
+            self.assertIsNone(solve(formula, assignment, encoding=encoding,
+                                    preprocess=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
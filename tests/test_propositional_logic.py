@@ -1,13 +1,37 @@
 # -*- coding: utf-8 -*-
 import unittest
 import random
-from ssaa.random_formula import random_formula, random_assignment
+import pickle
+import os
+import sys
+import subprocess
+from ssaa.random_formula import random_formula, random_assignment, \
+                                random_packed_assignment
 from ssaa.propositional_logic import UnassignedSymbol, to_cnf, is_cnf, \
                                      Symbol, is_atomic, apply_demorgan, \
                                      to_negative_normal_form, remove_sugar, \
-                                     is_negative_normal_form
+                                     is_negative_normal_form, Xor, \
+                                     And, Or, Not, Iff, Implies, \
+                                     post_order_depth_first, numpy, \
+                                     evaluate_packed, unpack_values, \
+                                     batch_evaluate, TRUE, FALSE, \
+                                     depth, size, symbols_of, \
+                                     to_clauses, TSEITIN, PLAISTED_GREENBAUM, \
+                                     DISTRIBUTE, AND_INVERTER, Constant
 from ssaa.propositional_logic import pformula, rformula, iter_symbols
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PICKLE_CHILD = """
+import pickle, sys
+from ssaa.propositional_logic import Symbol, Xor
+mine = set(Symbol(int(x)) for x in sys.argv[1:])
+formula, a, not_b = pickle.load(sys.stdin)
+print bool(set(formula.args) & mine)
+print formula.args[0] is a
+print formula is Xor(a, -not_b)
+"""
+
 
 class TestPropositionalLogic(unittest.TestCase):
     def test_is_atomic(self):
@@ -33,10 +57,187 @@ class TestPropositionalLogic(unittest.TestCase):
                     break
         self.assertEqual(len(values), 2)
 
+    def test_compiled_evaluation_works(self):
+        random.seed("satisfaction 9")
+        for depth in xrange(8):
+            for _ in xrange(10):
+                formula = random_formula(depth)
+                evaluate = formula.compile()
+                for _ in xrange(20):
+                    a = random_assignment(formula)
+                    self.assertEqual(evaluate(a), formula.evaluate(a))
+                symbol = random.choice(list(a))
+                del a[symbol]
+                self.assertRaises(UnassignedSymbol, evaluate, a)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_packed_evaluation_works(self):
+        random.seed("satisfaction 10")
+        for depth in xrange(8):
+            for _ in xrange(10):
+                formula = random_formula(depth)
+                packed = random_packed_assignment(formula, words=4)
+                result = unpack_values(evaluate_packed(formula, packed), 256)
+                evaluate = formula.compile()
+                for i, x in enumerate(result):
+                    word, bit = divmod(i, 64)
+                    a = dict((symbol, bool((int(values[word]) >> bit) & 1))
+                             for symbol, values in packed.iteritems())
+                    self.assertEqual(x, evaluate(a))
+                assignments = [random_assignment(formula) for _ in xrange(70)]
+                self.assertEqual(batch_evaluate(formula, assignments),
+                                 [evaluate(a) for a in assignments])
+                del assignments[-1][random.choice(list(assignments[-1]))]
+                self.assertRaises(UnassignedSymbol, batch_evaluate, formula,
+                                  assignments)
+
     def test_cnf_works(self):
         random.seed("satisfaction 2")
         self.brute_t3st_transformation(to_cnf, is_cnf, implies=True)
 
+    def test_tseitin_cnf_works(self):
+        random.seed("satisfaction 6")
+        tseitin = lambda x: to_cnf(x, TSEITIN)
+        self.brute_t3st_transformation(tseitin, is_cnf, implies=True)
+
+    def test_plaisted_greenbaum_cnf_works(self):
+        random.seed("satisfaction 7")
+        pg = lambda x: to_cnf(x, PLAISTED_GREENBAUM)
+        self.brute_t3st_transformation(pg, is_cnf, implies=True)
+
+    def test_tseitin_is_linear(self):
+        formula = Symbol()
+        for _ in xrange(40):
+            formula = Xor(formula, Symbol())
+        clauses, names, reverse = to_clauses(formula, TSEITIN)
+        self.assertEqual(len(clauses), 4 * 40 + 1)
+        self.assertEqual(len(reverse), 1 + 41 + 40)
+        clauses, names, reverse = to_clauses(formula, PLAISTED_GREENBAUM)
+        self.assertEqual(len(clauses), 4 * 39 + 2 + 1)
+
+    def test_structural_sharing(self):
+        a, b = Symbol(), Symbol()
+        self.assertIs(a & b, a & b)
+        self.assertIs(-(a | b), Not(Or(a, b)))
+        self.assertIs(And(a, And(b, a)), And(a, b, a))
+        self.assertIsNot(a & b, b & a)
+        self.assertIsNot(Iff(a, b), Xor(a, b))
+
+    def test_symbol_ids(self):
+        a, b = Symbol(), Symbol()
+        self.assertEqual(b.id, a.id + 1)
+        self.assertIs(Symbol(a.id), a)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertFalse(hasattr(a & b, "__dict__"))
+
+    def test_pickle_round_trip(self):
+        random.seed("satisfaction 8")
+        formula = random_formula(6)
+        for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+            loaded = pickle.loads(pickle.dumps(formula, protocol))
+            self.assertEqual(rformula(loaded), rformula(formula))
+            self.assertFalse(symbols_of(loaded) & symbols_of(formula))
+        a, b = Symbol(), Symbol()
+        # A fresh process with its own Symbols under the same ids
+        child = subprocess.Popen(
+            [sys.executable, "-c", PICKLE_CHILD, str(a.id), str(b.id)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=ROOT)
+        out, _ = child.communicate(pickle.dumps((Xor(a, b), a, -b)))
+        self.assertEqual(child.returncode, 0)
+        self.assertEqual(out.split(), ["False", "True", "True"])
+
+    def test_transformations_scale_with_dag_size(self):
+        formula = Symbol()
+        for _ in xrange(60):
+            formula = Xor(formula & Symbol(), formula | Symbol())
+        nodes = post_order_depth_first(formula)
+        self.assertEqual(len(nodes), 1 + 5 * 60)
+        nnf = to_negative_normal_form(formula)
+        self.assertTrue(len(post_order_depth_first(nnf)) < 20 * 60)
+
+    def test_structural_properties(self):
+        a, b, c = Symbol(), Symbol(), Symbol()
+        formula = Iff(a & b, -(b | c))
+        self.assertEqual(depth(formula), 3)
+        self.assertEqual(depth(a), 0)
+        self.assertEqual(size(formula), 7)
+        self.assertEqual(symbols_of(formula), set([a, b, c]))
+        self.assertEqual(list(iter_symbols(formula)), [a, b, c])
+        self.assertFalse(is_negative_normal_form(formula))
+        self.assertTrue(is_negative_normal_form(a & -(b | c).args[0]))
+        self.assertFalse(is_cnf(formula))
+        cnf = to_cnf(formula)
+        self.assertIs(to_cnf(formula), cnf)
+        self.assertIs(to_cnf(cnf), cnf)
+        clauses, names, reverse = to_clauses(cnf)
+        clauses.append([])
+        names.clear()
+        self.assertEqual(to_clauses(cnf)[0], clauses[:-1])
+        self.assertEqual(len(to_clauses(cnf)[1]), 3)
+
+    def test_constant_folding(self):
+        a, b = Symbol(), Symbol()
+        self.assertIs(-(-a), a)
+        self.assertIs(-TRUE, FALSE)
+        self.assertIs(a & -a, FALSE)
+        self.assertIs(Or(-a, b, a), TRUE)
+        self.assertIs(And(a, TRUE, b, a), a & b)
+        self.assertIs(And(a, FALSE, b), FALSE)
+        self.assertIs(Or(FALSE, FALSE), FALSE)
+        self.assertIs(a & (a | b), a)
+        self.assertIs(a | (b & a), a)
+        self.assertIs(And(a), a)
+        self.assertIs(Or(a & b), a & b)
+        self.assertIs(And(a, TRUE), a)
+        self.assertIs(Iff(a, TRUE), a)
+        self.assertIs(Iff(FALSE, a), -a)
+        self.assertIs(Iff(a, -a), FALSE)
+        self.assertIs(Xor(a, a), FALSE)
+        self.assertIs(Xor(TRUE, a), -a)
+        self.assertIs(Implies(a, a), TRUE)
+        self.assertIs(Implies(a, FALSE), -a)
+        self.assertIs(Implies(TRUE, b), b)
+        for formula in (TRUE, FALSE):
+            self.assertEqual(formula.evaluate({}), formula is TRUE)
+            self.assertEqual(formula.compile()({}), formula is TRUE)
+            self.assertIs(to_cnf(formula), formula)
+            self.assertIs(pickle.loads(pickle.dumps(formula)), formula)
+
+    def test_constants_in_every_encoding(self):
+        a = Symbol()
+        self.assertIs(Constant(True), TRUE)
+        self.assertIs(Constant(0), FALSE)
+        for encoding in (DISTRIBUTE, TSEITIN, PLAISTED_GREENBAUM,
+                         AND_INVERTER):
+            self.assertIs(to_cnf(FALSE, encoding), FALSE)
+            self.assertIs(to_cnf(TRUE, encoding), TRUE)
+            self.assertTrue(is_cnf(to_cnf(Xor(a, Constant(True)), encoding)))
+
+    def test_cnf_of_folding_clauses(self):
+        a, b, c, d, e = [Symbol() for _ in xrange(5)]
+        x = Or(And(a, b), -a, -b)  # Distributes into tautologies
+        y = Or(And(d, e), -d, -e)
+        self.assertIs(to_cnf(Or(c, And(x, y))), TRUE)
+        cnf = to_cnf(Or(c, And(x, d)))
+        self.assertTrue(is_cnf(cnf))
+        self.assertEqual(symbols_of(cnf), set([c, d]))
+
+    def test_deep_formulas(self):
+        formula = Symbol()
+        for _ in xrange(100000):
+            formula = Implies(Symbol(), -formula)
+        self.assertTrue(is_negative_normal_form(
+                                          to_negative_normal_form(formula)))
+        formula = Symbol()
+        for _ in xrange(600):  # CNF is quadratic in the depth of this one
+            formula = Implies(Symbol(), -formula)
+        self.assertTrue(is_cnf(to_cnf(formula)))
+        formula = Symbol()
+        for _ in xrange(10000):
+            formula = Iff(formula, Symbol())
+        self.assertEqual(pformula(formula).count("<=>"), 10000)
+        self.assertEqual(rformula(formula).count("Iff"), 10000)
+
     def test_nnf_works(self):
         random.seed("satisfaction 3")
         self.brute_t3st_transformation(to_negative_normal_form,
@@ -59,10 +260,14 @@ class TestPropositionalLogic(unittest.TestCase):
                 transformed = transformer(formula)
                 if checker is not None:
                     self.assertTrue(checker(transformed))
+                compiled = formula.compile()
+                compiled_transformed = transformed.compile()
                 for _ in xrange(1000):
                     a = random_assignment(transformed)
                     x = formula.evaluate(a)
                     y = transformed.evaluate(a)
+                    self.assertEqual(compiled(a), x)
+                    self.assertEqual(compiled_transformed(a), y)
                     if implies:
                         self.assertTrue(not y or x)
                     else:
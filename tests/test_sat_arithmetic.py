@@ -3,7 +3,7 @@ import unittest
 import random
 from ssaa.sat_arithmetic import Integer
 from ssaa.solver import solve
-from ssaa.propositional_logic import pformula
+from ssaa.propositional_logic import pformula, symbols_of
 
 
 class OperatorBruteForceMixin(object):
@@ -136,6 +136,18 @@ class TestAnd(unittest.TestCase, IntegerOperatorBruteForceMixin):
     def operator(self, a, b):
         return a & b
 
+    def test_operand_folded_away(self):
+        a = Integer(4)
+        c = a & 0
+        formula = c.get_propositional_formula()
+        self.assertFalse(a.get_symbols() & symbols_of(formula))
+        self.assertTrue(a.get_symbols() <= c.get_symbols())
+        model = solve(formula, symbols=c.get_symbols())
+        self.assertIn(a.recover_value(model), range(16))
+        self.assertEqual(c.recover_value(model), 0)
+        model = solve(formula, a.build_assignment(9))
+        self.assertEqual(a.recover_value(model), 9)
+
 
 class TestOr(unittest.TestCase, IntegerOperatorBruteForceMixin):
     def operator(self, a, b):
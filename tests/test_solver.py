@@ -1,5 +1,33 @@
 import unittest
-from ssaa.solver import simplify_clauses
+import random
+import os
+import sys
+import time
+import pickle
+import threading
+import itertools
+import functools
+import StringIO
+from ssaa.solver import simplify_clauses, solve, stupid_sat_solver, \
+                        bit_parallel_sat_solver, stream_clauses, ClauseList, \
+                        ClauseCounter, DimacsWriter, pycosat_solve, \
+                        iter_solutions, portfolio_solve, run_configuration, \
+                        portfolio_configurations, make_cubes, \
+                        cube_and_conquer, ExternalSolver, SolverTimeout, \
+                        is_theorem, solve_many, UNKNOWN
+from ssaa.cdcl import cdcl_solve
+from ssaa import solver as solver_module
+from ssaa.random_formula import random_formula, random_assignment, \
+                                random_clauses, pigeonhole
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import DISTRIBUTE, TSEITIN, PLAISTED_GREENBAUM, \
+                                     AND_INVERTER, numpy, symbols_of, \
+                                     Symbol, TRUE, FALSE, to_clauses, And, \
+                                     Or, Implies
+
+STAND_IN = [sys.executable, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "dimacs_solver.py")]
+
 
 
 class TestUnitPropagateClauses(unittest.TestCase):
@@ -49,11 +77,364 @@ class TestUnitPropagateClauses(unittest.TestCase):
         self.assertEqual(assign, set())
         self.assertEqual(free, set([1]))
 
+    def test_models_extend(self):
+        random.seed("Riders on the Storm")
+        for _ in xrange(200):
+            n = random.randint(1, 12)
+            clauses = random_clauses(n, random.randint(1, 3 * n), (1, 3))
+            simple, assign, free = simplify_clauses(clauses)
+            self.assertEqual(set(abs(x) for x in assign) & free, set())
+            model = pycosat_solve(simple) if [] not in simple else None
+            self.assertEqual(model is None, pycosat_solve(clauses) is None)
+            if model is not None:
+                model = set(model) | assign | free
+                for clause in clauses:
+                    self.assertTrue(any(x in model for x in clause))
 
     def _same_clauses(self, a, b):
         a = sorted(set(x) for x in a)
         b = sorted(set(x) for x in b)
         self.assertEqual(a, b)
 
+
+class TestStreamClauses(unittest.TestCase):
+    def test_sinks(self):
+        random.seed("Comfortably Numb")
+        for encoding in (DISTRIBUTE, TSEITIN, PLAISTED_GREENBAUM,
+                         AND_INVERTER):
+            formula = random_formula(3)
+            cnf = formula
+            if encoding == DISTRIBUTE:
+                cnf = formula.to_cnf()
+            clauses, _, reverse = to_clauses(cnf, encoding)
+            sink = ClauseList()
+            names, reverse = stream_clauses(formula, sink, encoding)
+            self.assertEqual(sink.clauses, clauses)
+            counter = ClauseCounter()
+            stream_clauses(formula, counter, encoding)
+            self.assertEqual(counter.clauses, len(clauses))
+            self.assertEqual(counter.literals, sum(len(x) for x in clauses))
+            self.assertEqual(counter.variables, len(reverse) - 1)
+            fout = StringIO.StringIO()
+            stream_clauses(formula, DimacsWriter(fout), encoding)
+            lines = fout.getvalue().splitlines()
+            self.assertEqual(lines[1].split(),
+                   ["p", "cnf", str(len(reverse) - 1), str(len(clauses))])
+            self.assertEqual(len(lines), len(clauses) + 2)
+            self.assertEqual(lines[2:],
+                             [" ".join(map(str, x + [0])) for x in clauses])
+
+
+class TestSolve(unittest.TestCase):
+    def test_encodings_agree_with_evaluation(self):
+        random.seed("Hotel California")
+        # DISTRIBUTE is exponential, keep it shallow
+        for encoding, depths in ((DISTRIBUTE, 4), (TSEITIN, 6),
+                                 (PLAISTED_GREENBAUM, 6), (AND_INVERTER, 6)):
+            for depth in xrange(depths):
+                for _ in xrange(20):
+                    formula = random_formula(depth)
+                    a = random_assignment(formula)
+                    model = solve(formula, a, encoding=encoding)
+                    self.assertEqual(model is not None, formula.evaluate(a))
+                    model = solve(formula, encoding=encoding)
+                    if model is not None:
+                        self.assertTrue(formula.evaluate(model))
+                        # No auxiliary variables of the encoding
+                        self.assertEqual(set(model), symbols_of(formula))
+
+    def test_iter_solutions(self):
+        random.seed("Kashmir")
+        for encoding in (DISTRIBUTE, TSEITIN, AND_INVERTER):
+            for depth in xrange(4):
+                for _ in xrange(10):
+                    formula = random_formula(depth)
+                    symbols = sorted(symbols_of(formula), key=lambda x: x.id)
+                    if len(symbols) > 10:
+                        continue
+                    project = symbols[:3]
+                    expected = set()
+                    for bools in itertools.product([False, True],
+                                                   repeat=len(symbols)):
+                        a = dict(zip(symbols, bools))
+                        if formula.evaluate(a):
+                            expected.add(tuple(a[x] for x in project))
+                    found = []
+                    for model in iter_solutions(formula, project=project,
+                                                encoding=encoding):
+                        self.assertTrue(formula.evaluate(model))
+                        self.assertEqual(set(model), set(symbols))
+                        found.append(tuple(model[x] for x in project))
+                    self.assertEqual(len(found), len(set(found)))
+                    self.assertEqual(set(found), expected)
+
+    def test_portfolio(self):
+        random.seed("Paranoid Android")
+        configurations = portfolio_configurations(6)
+        self.assertEqual(len(set(configurations)), 6)
+        for _ in xrange(20):
+            n = random.randint(5, 40)
+            clauses = random_clauses(n, int(4.3 * n))
+            sat = pycosat_solve(clauses) is not None
+            for configuration in configurations:
+                model = run_configuration(clauses, configuration)
+                self.assertEqual(model is not None, sat)
+                if model is not None:
+                    self.assertEqual(len(model), max(abs(x) for clause in
+                                                     clauses for x in clause))
+                    model = set(model)
+                    for clause in clauses:
+                        self.assertTrue(any(x in model for x in clause))
+        formula = random_formula(5)
+        model = solve(formula, encoding=TSEITIN, conflict_limit=100000,
+                      solver=functools.partial(portfolio_solve, workers=2))
+        self.assertEqual(model is None,
+                         solve(formula, encoding=TSEITIN) is None)
+        if model is not None:
+            self.assertTrue(formula.evaluate(model))
+
+    def test_cube_and_conquer(self):
+        random.seed("Karma Police")
+        for _ in xrange(20):
+            n = random.randint(5, 40)
+            clauses = random_clauses(n, int(4.3 * n))
+            sat = pycosat_solve(clauses) is not None
+            candidates = range(1, n + 1)
+            cubes = make_cubes(clauses, candidates, 3)
+            self.assertTrue(len(cubes) <= 8)
+            self.assertEqual(any(pycosat_solve(clauses + [[x] for x in cube])
+                                 is not None for cube in cubes), sat)
+            for workers in [1, 2]:
+                model = cube_and_conquer(clauses, candidates, 3, workers)
+                self.assertEqual(model is not None, sat)
+                if model is not None:
+                    model = set(model)
+                    for clause in clauses:
+                        self.assertTrue(any(x in model for x in clause))
+        a = Integer(8)
+        b = Integer(8)
+        c = a * b
+        formula = c.get_propositional_formula()
+        product = c.build_assignment(151)
+        for workers in [1, 2]:
+            model = solve(formula, product, encoding=TSEITIN, cube_depth=3,
+                          workers=workers, split_on=a.bits + b.bits)
+            self.assertEqual(a.recover_value(model) * b.recover_value(model)
+                             % 256, 151)
+        product.update(a.build_assignment(2))
+        self.assertIsNone(solve(formula, product, encoding=TSEITIN,
+                                cube_depth=2, workers=2))
+
+    def test_solve_many(self):
+        random.seed("Lucky")
+        for _ in xrange(20):
+            formula = random_formula(3)
+            symbols = list(symbols_of(formula))
+            assignments = [dict((x, random.random() < 0.5)
+                                for x in random.sample(
+                                    symbols, random.randint(0, len(symbols))))
+                           for _ in xrange(5)]
+            results = list(solve_many(formula, assignments, workers=1))
+            self.assertEqual(len(results), len(assignments))
+            for assignment, model in zip(assignments, results):
+                self.assertEqual(model is None,
+                                 solve(formula, assignment) is None)
+                if model is not None:
+                    for symbol, value in assignment.iteritems():
+                        self.assertEqual(model[symbol], value)
+                    self.assertTrue(formula.evaluate(model))
+        # A pure literal of the formula can still be assigned the other way
+        a, b, c = Symbol(), Symbol(), Symbol()
+        model, = solve_many(Or(a, b), [{a: False, c: True}], workers=1)
+        self.assertEqual(model, {a: False, b: True, c: True})
+        a = Integer(8)
+        b = Integer(8)
+        c = a * b
+        formula = c.get_propositional_formula()
+        assignments = [c.build_assignment(x) for x in [151, 7, 0, 255]]
+        contradiction = c.build_assignment(151)
+        contradiction.update(a.build_assignment(2))
+        assignments.append(contradiction)
+        for workers in [1, 2]:
+            results = list(solve_many(formula, assignments, encoding=TSEITIN,
+                                      workers=workers))
+            for x, model in zip([151, 7, 0, 255], results):
+                self.assertEqual(a.recover_value(model) *
+                                 b.recover_value(model) % 256, x)
+                self.assertEqual(set(model), symbols_of(formula))
+            self.assertIsNone(results[-1])
+        pairs = list(solve_many(formula, assignments, encoding=TSEITIN,
+                                workers=2, ordered=False))
+        self.assertEqual(sorted(index for index, _ in pairs), range(5))
+        self.assertIsNone(dict(pairs)[4])
+        results = solve_many(formula, assignments, encoding=TSEITIN,
+                             workers=2)
+        self.assertIsNotNone(next(results))
+        results.close()
+
+    def test_external_solver(self):
+        random.seed("Money")
+        external = ExternalSolver(STAND_IN, timeout=60)
+        for _ in xrange(5):
+            n = random.randint(5, 40)
+            clauses = random_clauses(n, int(4.3 * n))
+            model = external(clauses)
+            self.assertEqual(model is None, pycosat_solve(clauses) is None)
+            if model is not None:
+                model = set(model)
+                for clause in clauses:
+                    self.assertTrue(any(x in model for x in clause))
+        a = Integer(6)
+        b = Integer(6)
+        c = a * b
+        formula = c.get_propositional_formula()
+        assignment = c.build_assignment(35)
+        assignment.update(a.build_assignment(5))
+        model = solve(formula, assignment, solver=external, encoding=TSEITIN)
+        self.assertEqual(b.recover_value(model), 7)
+        self.assertRaises(RuntimeError,
+                          ExternalSolver(STAND_IN + ["--unknown"]), [[1]])
+
+    def test_external_solver_timeout(self):
+        slow = ExternalSolver(STAND_IN + ["--sleep", "30"], timeout=0.5)
+        start = time.time()
+        self.assertRaises(SolverTimeout, slow, [[1, 2], [-1]])
+        self.assertTrue(time.time() - start < 10)
+        self.assertIsNone(slow.process)
+        slow.timeout = None
+        threading.Timer(0.5, slow.cancel).start()
+        start = time.time()
+        self.assertRaises(SolverTimeout, slow, [[1, 2], [-1]])
+        self.assertTrue(time.time() - start < 10)
+
+    def test_constant_formulas(self):
+        a = Symbol()
+        b = Symbol()
+        self.assertEqual(solve(TRUE), {})
+        self.assertEqual(solve(FALSE), None)
+        self.assertEqual(solve(a | -a, {a: False}), {a: False})
+        self.assertEqual(solve(a & -a, {a: True}), None)
+        # Only folds to TRUE in negative normal form
+        self.assertEqual(solve(-(a & b) | a, {a: True, b: False}),
+                         {a: True, b: False})
+        # Symbols whose clauses fold away still get a value
+        self.assertEqual(set(solve(Or(-a, Implies(-b, a)))), set([a, b]))
+        c, d, e = Symbol(), Symbol(), Symbol()
+        x = Or(And(a, b), -a, -b)
+        y = Or(And(d, e), -d, -e)
+        formula = Or(c, And(x, y))
+        for model in [solve(formula), next(iter_solutions(formula)),
+                      next(solve_many(formula, [{c: False}], workers=1))]:
+            self.assertEqual(set(model), set([a, b, c, d, e]))
+
+    def test_stupid_sat_solver(self):
+        self._t3st_brute_force_solver(stupid_sat_solver)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_bit_parallel_sat_solver(self):
+        solver = lambda formula, prev=None: \
+                        bit_parallel_sat_solver(formula, prev, words=2)
+        self._t3st_brute_force_solver(solver)
+
+    def _t3st_brute_force_solver(self, solver):
+        random.seed("Stairway to Heaven")
+        for depth in xrange(5):
+            for _ in xrange(20):
+                formula = random_formula(depth)
+                if len(symbols_of(formula)) > 16:
+                    continue
+                model = solver(formula)
+                self.assertEqual(model is None,
+                                 solve(formula, encoding=TSEITIN) is None)
+                if model is not None:
+                    self.assertTrue(formula.evaluate(model))
+                a = random_assignment(formula)
+                del a[random.choice(list(a))]
+                model = solver(formula, a)
+                self.assertEqual(model is None,
+                                 solve(formula, a, encoding=TSEITIN) is None)
+                if model is not None:
+                    self.assertTrue(formula.evaluate(model))
+                    for symbol, value in a.iteritems():
+                        self.assertEqual(model[symbol], value)
+
+
+class TestLimits(unittest.TestCase):
+    def test_unknown(self):
+        self.assertIs(pickle.loads(pickle.dumps(UNKNOWN)), UNKNOWN)
+        formula = pigeonhole(11)
+        for solver in (pycosat_solve, cdcl_solve):
+            self.assertIs(solve(formula, solver=solver, conflict_limit=100),
+                          UNKNOWN)
+            self.assertIs(solve(formula, solver=solver,
+                                propagation_limit=1000), UNKNOWN)
+            start = time.time()
+            self.assertIs(solve(formula, solver=solver,
+                                deadline=time.time() + 0.5), UNKNOWN)
+            self.assertTrue(time.time() - start < 10)
+        self.assertIs(is_theorem(-formula, conflict_limit=100), UNKNOWN)
+        formula = pigeonhole(4)
+        self.assertIsNone(solve(formula, conflict_limit=1000))
+        self.assertIs(is_theorem(-formula, deadline=time.time() + 60), True)
+        formula = formula | Symbol()
+        model = solve(formula, propagation_limit=1000)
+        self.assertTrue(formula.evaluate(model))
+
+    @unittest.skipIf(solver_module.pycosat is None, "pycosat is not installed")
+    def test_deadline_slices(self):
+        clauses, _, _ = to_clauses(pigeonhole(11).to_cnf())
+        pycosat = solver_module.pycosat
+        slices = []
+
+        class Recorder(object):
+            @staticmethod
+            def solve(clauses, verbose, prop_limit):
+                slices.append(prop_limit)
+                return pycosat.solve(clauses, verbose=verbose,
+                                     prop_limit=prop_limit)
+        solver_module.pycosat = Recorder
+        try:
+            # Starting over on the 50000 propagations left is hopeless
+            self.assertIs(pycosat_solve(clauses, propagation_limit=150000,
+                                        deadline=time.time() + 600), UNKNOWN)
+            self.assertEqual(slices, [100000])
+            del slices[:]
+            deadline = time.time() + 1
+            self.assertIs(pycosat_solve(clauses, deadline=deadline), UNKNOWN)
+            self.assertTrue(all(a < b for a, b in zip(slices, slices[1:])))
+        finally:
+            solver_module.pycosat = pycosat
+
+    def test_parallel_and_external(self):
+        clauses, _, _ = to_clauses(pigeonhole(11).to_cnf())
+        candidates = range(1, 11)
+        for workers in [1, 2]:
+            self.assertIs(cube_and_conquer(clauses, candidates, 2, workers,
+                                           cdcl_solve,
+                                           {"conflict_limit": 10}),
+                          UNKNOWN)
+        self.assertIsNone(cube_and_conquer([[1], [-1, 2], [-2]], [1, 2], 1,
+                                           1, cdcl_solve,
+                                           {"conflict_limit": 10}))
+        for workers in [1, 2]:
+            portfolio = lambda x, **limits: portfolio_solve(x, workers,
+                                                            **limits)
+            self.assertIs(portfolio(clauses, conflict_limit=10), UNKNOWN)
+            start = time.time()
+            self.assertIs(solve(pigeonhole(11), solver=portfolio,
+                                deadline=time.time() + 0.5), UNKNOWN)
+            self.assertTrue(time.time() - start < 10)
+            self.assertIsNone(solve(pigeonhole(4), solver=portfolio,
+                                    conflict_limit=1000))
+        slow = ExternalSolver(STAND_IN + ["--sleep", "30"], timeout=60)
+        start = time.time()
+        self.assertIs(slow([[1, 2], [-1]], deadline=time.time() + 0.5),
+                      UNKNOWN)
+        self.assertTrue(time.time() - start < 10)
+        slow.timeout = 0.5
+        self.assertRaises(SolverTimeout, slow, [[1, 2], [-1]],
+                          deadline=time.time() + 60)
+
+
 if __name__ == "__main__":
     unittest.main()
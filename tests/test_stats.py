@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import unittest
+from ssaa.stats import SolveStats, peak_rss
+from ssaa.solver import solve, UNKNOWN
+from ssaa.sat_arithmetic import Integer
+from ssaa.propositional_logic import DISTRIBUTE, TSEITIN, Symbol
+
+
+class TestSolveStats(unittest.TestCase):
+    def test_phases(self):
+        a = Integer(6)
+        b = Integer(6)
+        c = a * b
+        formula = c.get_propositional_formula()
+        seen = []
+        stats = SolveStats(callback=seen.append)
+        model = solve(formula, c.build_assignment(35), encoding=TSEITIN,
+                      stats=stats, preprocess=True)
+        self.assertEqual(a.recover_value(model) * b.recover_value(model) % 64,
+                         35)
+        self.assertEqual([x.name for x in stats.phases],
+                         ["to_clauses", "assignment_to_clauses",
+                          "simplify_clauses", "preprocess", "solve",
+                          "lits_to_assignment"])
+        self.assertEqual(seen, stats.phases)
+        self.assertTrue(all(x.seconds >= 0 for x in stats.phases))
+        self.assertEqual(stats.result, "sat")
+        counts = stats.counts
+        self.assertTrue(counts["formula_nodes"] > 0)
+        self.assertTrue(counts["clauses"] > counts["simplified_clauses"] >=
+                        counts["preprocessed_clauses"])
+        self.assertTrue(counts["variables"] >= counts["simplified_variables"]
+                        >= counts["preprocessed_variables"])
+        summary = stats.as_dict()
+        self.assertEqual(summary["clauses"], counts["clauses"])
+        self.assertAlmostEqual(summary["seconds"],
+                               sum(x.seconds for x in stats.phases))
+        self.assertEqual(summary["result"], "sat")
+        if peak_rss() is not None:
+            self.assertEqual(summary["peak_rss"], stats.peak_rss)
+            self.assertTrue(peak_rss() >= stats.peak_rss > 0)
+            increases = [x.peak_rss_increase for x in stats.phases]
+            self.assertTrue(all(x >= 0 for x in increases))
+            self.assertEqual(summary["solve_peak_rss_increase"],
+                             stats.phases[4].peak_rss_increase)
+            # The increases add up to at most the growth of the peak
+            before = peak_rss()
+            stats = SolveStats()
+            solve(formula, c.build_assignment(35), encoding=TSEITIN,
+                  stats=stats)
+            self.assertTrue(sum(x.peak_rss_increase for x in stats.phases)
+                            <= stats.peak_rss - before)
+
+    def test_results(self):
+        x = Symbol()
+        stats = SolveStats()
+        self.assertIsNone(solve(x & -x, encoding=DISTRIBUTE, stats=stats))
+        self.assertEqual(stats.result, "unsat")
+        self.assertEqual(stats.phases[0].name, "to_cnf")
+        self.assertTrue("cnf_nodes" in stats.counts)
+        formula = (Integer(12) * Integer(12)).get_propositional_formula()
+        stats = SolveStats()
+        self.assertIs(solve(formula, encoding=TSEITIN, stats=stats,
+                            propagation_limit=0), UNKNOWN)
+        self.assertEqual(stats.result, "unknown")
+        self.assertEqual(stats.phases[-1].name, "solve")
+
+
+if __name__ == "__main__":
+    unittest.main()